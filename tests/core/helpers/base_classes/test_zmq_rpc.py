@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2016 Lancaster University.
+#
+#
+# This file is part of Yarely.
+#
+# Licensed under the Apache License, Version 2.0.
+# For full licensing information see /LICENSE.
+
+
+# Standard library imports
+import doctest
+import unittest
+from xml.etree import ElementTree
+
+# Third party imports
+import zmq
+
+# Local (Yarely) imports
+from yarely.core.helpers.base_classes import zmq_rpc
+
+
+def load_tests(loader, tests, ignore):
+    """FIXME
+
+    :param loader: FIXME.
+    :type loader: FIXME.
+    :param tests: FIXME.
+    :type tests: FIXME.
+    :param ignore: FIXME.
+    :type ignore: FIXME.
+    :rtype: FIXME.
+
+    """
+    tests.addTests(doctest.DocTestSuite(zmq_rpc))
+    return tests
+
+
+class ZMQRPCTestCase(unittest.TestCase):
+    """FIXME"""
+
+    def setUp(self):
+        """FIXME"""
+
+        class RPC(zmq_rpc.ZMQRPC):
+            def _handle_register(self, msg_root):
+                return 'register'
+
+        self.rpc = RPC()
+
+    def test_register(self):
+        """FIXME"""
+        self.assertEqual(
+            self.rpc._handle_zmq_msg(b'<register token="x" />'), 'register'
+        )
+
+    def test_request_ping(self):
+        """FIXME"""
+        reply = self.rpc._handle_zmq_msg('<request><ping /></request>')
+        self.assertEqual(
+            ElementTree.tostring(reply), b'<reply><pong /></reply>'
+        )
+
+    def test_unknown_message(self):
+        """FIXME"""
+        with self.assertRaises(zmq_rpc.ZMQRPCError):
+            self.rpc._handle_zmq_msg('<request><unknown /></request>')
+
+    def test_constant_replies(self):
+        """FIXME"""
+        self.rpc._init_constant_replies()
+        self.assertEqual(self.rpc._zmq_pong_reply, b'<reply><pong /></reply>')
+        self.assertEqual(
+            self.rpc._zmq_error_reply, b'<reply><error /></reply>'
+        )
+
+    def test_serialise_reply(self):
+        """FIXME"""
+        reply = self.rpc._handle_zmq_msg('<request><ping /></request>')
+        self.assertEqual(
+            self.rpc._serialise_reply(reply), b'<reply><pong /></reply>'
+        )
+
+    def test_termination_channel(self):
+        """FIXME"""
+        self.rpc.zmq_context = zmq.Context()
+        self.rpc._bind_termination_socket('test_term_{}'.format(id(self)))
+        pull_socket = self.rpc._connect_termination_socket()
+        self.rpc._send_termination()
+        self.assertEqual(pull_socket.recv(), b'TERMINATE')
+        pull_socket.close()
+        self.rpc._zmq_termination_push_socket.close()
+        self.rpc.zmq_context.term()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2016 Lancaster University.
+#
+#
+# This file is part of Yarely.
+#
+# Licensed under the Apache License, Version 2.0.
+# For full licensing information see /LICENSE.
+
+
+# Standard library imports
+import concurrent.futures
+import unittest
+
+# Local (Yarely) imports
+from yarely.core.helpers import execution
+
+
+class RunInBackgroundTestCase(unittest.TestCase):
+    """FIXME"""
+
+    def setUp(self):
+        """FIXME"""
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def tearDown(self):
+        """FIXME"""
+        self.executor.shutdown()
+
+    def test_kwargs_passed(self):
+        """FIXME"""
+        results = []
+
+        def record(result):
+            results.append(result)
+
+        execution.run_in_background(self.executor, record, result='result')
+        self.executor.shutdown()
+        self.assertEqual(results, ['result'])
+
+    def test_exception_logged(self):
+        """FIXME"""
+        def fail():
+            raise ValueError('failed')
+
+        with self.assertLogs(execution.log, level='ERROR'):
+            execution.run_in_background(self.executor, fail)
+            self.executor.shutdown()
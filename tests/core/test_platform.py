@@ -11,12 +11,14 @@
 
 # Standard library imports
 import doctest
+import os
 import tempfile
 import unittest
 import urllib.parse
 
 # Local (Yarely) imports
 from yarely.core import platform
+from yarely.core.platform import common_uri
 
 
 def load_tests(loader, tests, ignore):
@@ -32,6 +34,7 @@ def load_tests(loader, tests, ignore):
 
     """
     tests.addTests(doctest.DocTestSuite(platform))
+    tests.addTests(doctest.DocTestSuite(common_uri))
     return tests
 
 
@@ -74,6 +77,18 @@ class URILocalPathConversionTestCase(unittest.TestCase):
             self._path, platform.get_local_path_from_uri(self._result)
         )
 
+    def test_geturi_relative_path_follows_cwd(self):
+        """FIXME"""
+        cwd = os.getcwd()
+        try:
+            os.chdir(self._path)
+            first_result = platform.get_uri_from_local_path('file')
+            os.chdir(os.path.dirname(self._path))
+            second_result = platform.get_uri_from_local_path('file')
+        finally:
+            os.chdir(cwd)
+        self.assertNotEqual(first_result, second_result)
+
     def test_getlocalpath_raises(self):
         """FIXME"""
         erroneous_result = urllib.parse.ParseResult(
@@ -11,9 +11,19 @@
 
 # Standard library imports
 # import doctest
+import os
+import tempfile
+import unittest
+from unittest import mock
 
 # Local (Yarely) imports
 from yarely.core import scheduling  # NOQA
+from yarely.core.scheduling import (
+    contextconstraintsparser, contextstore, display
+)
+from yarely.core.scheduling.contextstore.constants import (
+    CONTEXT_TYPE_SENSOR_UPDATE
+)
 
 
 def load_tests(loader, tests, ignore):
@@ -30,3 +40,154 @@ def load_tests(loader, tests, ignore):
     """
     # tests.addTests(doctest.DocTestSuite(scheduling))
     return tests
+
+
+class ContextConstraintsParserTestCase(unittest.TestCase):
+    """FIXME"""
+
+    SUBSCRIPTION_UPDATE = (
+        b'<request><subscription_update uri="file:///subscription">'
+        b'<content-set /></subscription_update></request>'
+    )
+
+    def setUp(self):
+        """FIXME"""
+        patch_context_store = mock.patch.object(
+            contextconstraintsparser, 'ContextStore'
+        )
+        patch_context_store.start()
+        self.addCleanup(patch_context_store.stop)
+
+        self.scheduler_mgr = mock.Mock()
+        self.parser = contextconstraintsparser._ContextConstraintsParser(
+            self.scheduler_mgr
+        )
+        self.addCleanup(self.parser.zmq_context.term)
+        self.addCleanup(self.parser._zmq_termination_push_socket.close)
+
+    def _parse_cds(self, parsed_cds):
+        return mock.patch.object(
+            self.parser, '_parse_raw_cds_xml', return_value=parsed_cds
+        )
+
+    def test_repeated_subscription_update_dropped(self):
+        """FIXME"""
+        with self._parse_cds(mock.sentinel.cds) as parse_cds:
+            for _ in range(2):
+                self.assertEqual(
+                    self.parser._handle_zmq_msg(self.SUBSCRIPTION_UPDATE),
+                    self.parser._zmq_pong_reply
+                )
+        self.assertEqual(parse_cds.call_count, 1)
+        self.scheduler_mgr.cds_updates.put.assert_called_once_with(
+            mock.sentinel.cds
+        )
+
+    def test_unparsed_subscription_update_not_dropped(self):
+        """FIXME"""
+        with self._parse_cds(None) as parse_cds:
+            for _ in range(2):
+                reply = self.parser._handle_zmq_msg(self.SUBSCRIPTION_UPDATE)
+                self.assertEqual(
+                    self.parser._serialise_reply(reply),
+                    self.parser._zmq_pong_reply
+                )
+        self.assertEqual(parse_cds.call_count, 2)
+        self.assertFalse(self.scheduler_mgr.cds_updates.put.called)
+
+
+class ContextStoreTestCase(unittest.TestCase):
+    """FIXME"""
+
+    def setUp(self):
+        """FIXME"""
+        db_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(db_dir.cleanup)
+        self.db_path = os.path.join(db_dir.name, 'context_store.sqlite')
+        self.context_store = contextstore.ContextStore(self.db_path)
+
+    def _count_sensor_updates(self):
+        reader = contextstore.ContextStore(self.db_path)
+        rows = reader.get_latest_context_by_type(
+            CONTEXT_TYPE_SENSOR_UPDATE, n=10
+        )
+        reader.close()
+        return len(rows)
+
+    def test_close_writes_queued_context(self):
+        """FIXME"""
+        callback = mock.Mock()
+        for _ in range(3):
+            self.context_store.add_context_async(
+                CONTEXT_TYPE_SENSOR_UPDATE, None, callback=callback
+            )
+        self.context_store.close()
+        self.assertEqual(self._count_sensor_updates(), 3)
+        self.assertTrue(callback.called)
+
+    def test_callback_called_after_failed_write(self):
+        """FIXME"""
+        callback = mock.Mock()
+        with mock.patch.object(
+            self.context_store, '_get_content_item_xml',
+            side_effect=ValueError
+        ):
+            self.context_store.add_context_async(
+                CONTEXT_TYPE_SENSOR_UPDATE, None, callback=callback
+            )
+            self.context_store.close()
+        callback.assert_called_once_with()
+        self.assertEqual(self._count_sensor_updates(), 0)
+
+
+class DisplayManagerTestCase(unittest.TestCase):
+    """FIXME"""
+
+    class _ContentItem(object):
+        def get_content_type(self):
+            return 'image/png'
+
+        def __str__(self):
+            return 'http://example.com/image.png'
+
+    def setUp(self):
+        """FIXME"""
+        self.display_manager = display.DisplayManager(None)
+
+        patch_args = mock.patch.object(
+            display, 'get_initial_args',
+            return_value={'module': 'image', 'param_type': 'uri'}
+        )
+        patch_subprocess = mock.patch.object(
+            display, 'SubprocessExecutionWithErrorCapturing'
+        )
+        patch_args.start()
+        patch_subprocess.start()
+        self.addCleanup(patch_args.stop)
+        self.addCleanup(patch_subprocess.stop)
+
+    def _start_renderer(self):
+        item = self._ContentItem()
+        self.display_manager._start_renderer(item, display.DEFAULT_POSITION)
+        renderer, = self.display_manager._renderers.values()
+        return item, renderer
+
+    def test_set_renderer_visible(self):
+        """FIXME"""
+        item, renderer = self._start_renderer()
+        self.display_manager._set_renderer_visible(renderer)
+        self.assertIs(self.display_manager.get_active_item()[0], item)
+
+    def test_set_removed_renderer_visible(self):
+        """FIXME"""
+        item, renderer = self._start_renderer()
+        self.display_manager.remove_items()
+        self.display_manager._set_renderer_visible(renderer)
+        self.assertEqual(
+            self.display_manager.get_active_item(), (None, None)
+        )
+        self.assertFalse(
+            self.display_manager._check_item_is_at_position(
+                item, display.DEFAULT_POSITION
+            )
+        )
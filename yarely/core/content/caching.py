@@ -1,5 +1,6 @@
 # Standard library import
 import contextlib
+import functools
 import hashlib
 import logging
 import os
@@ -21,6 +22,22 @@ RETRY_FAILED_TIMEOUT = 5*60  # seconds
 DOWNLOAD_SUFFIX = ".download"
 log = logging.getLogger(__name__)
 
+# Whether a content type needs caching only depends on the (static) MIME type
+# config, so the answer is cached per content type for the life of the
+# process. Bounded, as content types come from subscriptions.
+_CONTENT_TYPE_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=_CONTENT_TYPE_CACHE_SIZE)
+def _content_type_needs_to_be_cached(content_type):
+    """ Checks if files of the given content type need to be cached. """
+    try:
+        args = get_initial_args(content_type)
+    except UnsupportedMimeTypeError:
+        return False
+
+    return 'precache' in args and args['precache']
+
 
 class Cache(object):
     """ Yarely caching module. """
@@ -223,12 +240,7 @@ class Cache(object):
         # Get the content type of the ContentItem object
         content_type = content_item.get_content_type()
 
-        try:
-            args = get_initial_args(content_type)
-        except UnsupportedMimeTypeError:
-            return False
-
-        return 'precache' in args and args['precache']
+        return _content_type_needs_to_be_cached(content_type)
 
 
 class CachingFailedError(Exception):
@@ -257,6 +269,14 @@ class CacheManager(object):
         """ Cache content item (adds it to the queue) """
         self.cache_queue.put(content_item)
 
+    def cache_files(self, content_items):
+        """ Cache content items (adds each of them to the queue). The queue
+        is unbounded, so this never blocks.
+        """
+        put_nowait = self.cache_queue.put_nowait
+        for content_item in content_items:
+            put_nowait(content_item)
+
     def start(self, number_of_threads=DEFAULT_NUMBER_OF_THREADS):
         """ Start N threads that are waiting on the cache queue. """
 
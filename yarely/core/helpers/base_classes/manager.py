@@ -122,6 +122,8 @@ class Manager(ApplicationWithConfig, ZMQRPC):
 
         # ZMQ setup
         self.zmq_context = zmq.Context()
+
+        self._init_constant_replies()
         self.zmq_manager_term_identifier = "manager_term_{id}".format(
             id=id(self)
         )
@@ -250,8 +252,8 @@ class Manager(ApplicationWithConfig, ZMQRPC):
                     reply = self._handle_zmq_msg(msg)
                     if reply is None:
                         log.warning(WARN_NO_REPLY)
-                        reply = self._encapsulate_reply(self._generate_error())
-                    sock.send(ElementTree.tostring(reply))
+                        reply = self._zmq_error_reply
+                    sock.send(self._serialise_reply(reply))
             return term
 
         # Poll for messages
@@ -308,8 +310,7 @@ class Manager(ApplicationWithConfig, ZMQRPC):
                 log.error(msg.format(token=token))
             else:
                 handler.last_checkin = time.time()
-            reply = self._encapsulate_reply(self._generate_pong())
-            return reply
+            return self._zmq_pong_reply
 
     def _lookup_executing_handler_with_token(self, token):
         with self._lock:
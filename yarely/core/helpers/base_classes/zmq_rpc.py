@@ -10,8 +10,31 @@
 
 
 # Standard library imports
+import functools
 from xml.etree import ElementTree
 
+# Third party imports
+import zmq
+
+# Local (Yarely) imports
+from yarely.core.helpers.zmq import ZMQ_ADDRESS_INPROC, ZMQ_SOCKET_LINGER_MSEC
+
+
+# Message tags come from a small, fixed set, so the handler method names
+# derived from them are cached (bounded, as the tags arrive over the wire).
+_HANDLER_NAME_CACHE_SIZE = 128
+
+
+@functools.lru_cache(maxsize=_HANDLER_NAME_CACHE_SIZE)
+def _get_handler_name(root_tag, elem_tag):
+    """Return the name of the method that handles a message.
+
+    >>> _get_handler_name('request', 'ping')
+    '_handle_request_ping'
+
+    """
+    return '_handle_{root}_{elem}'.format(root=root_tag, elem=elem_tag)
+
 
 class ZMQRPCError(Exception):
     """Base class for ZMQ RPC errors."""
@@ -24,6 +47,33 @@ class ZMQRPCError(Exception):
 class ZMQRPC(object):
     """Provides some common ZMQ RPC operations."""
 
+    def _bind_termination_socket(self, identifier):
+        """Create the termination channel to a reply thread: a PUSH socket
+        (using self.zmq_context) bound to the inproc address named by
+        identifier. It is created once so that stopping the reply thread only
+        has to send a message down it (see _send_termination()).
+
+        :param string identifier: the name of the inproc address.
+
+        """
+        self._zmq_termination_address = ZMQ_ADDRESS_INPROC.format(
+            identifier=identifier
+        )
+        self._zmq_termination_push_socket = self.zmq_context.socket(zmq.PUSH)
+        self._zmq_termination_push_socket.setsockopt(
+            zmq.LINGER, ZMQ_SOCKET_LINGER_MSEC
+        )
+        self._zmq_termination_push_socket.bind(self._zmq_termination_address)
+
+    def _connect_termination_socket(self):
+        """Return a PULL socket connected to the termination channel (see
+        _bind_termination_socket()). The reply thread stops once it has data.
+
+        """
+        zmq_termination_pull_socket = self.zmq_context.socket(zmq.PULL)
+        zmq_termination_pull_socket.connect(self._zmq_termination_address)
+        return zmq_termination_pull_socket
+
     def _encapsulate_reply(self, children):
         """Wrap the specified child XML elements in a reply element.
 
@@ -62,6 +112,22 @@ class ZMQRPC(object):
             root.extend(children)
         return root
 
+    def _init_constant_replies(self):
+        """Serialise the replies that never change - a plain pong and a plain
+        error - once up front, as _zmq_pong_reply and _zmq_error_reply. Most
+        requests are answered with one of these.
+
+        The replies are not encapsulated with a token.
+
+        """
+        pong_root = ElementTree.Element('reply')
+        pong_root.append(self._generate_pong())
+        self._zmq_pong_reply = ElementTree.tostring(pong_root)
+
+        error_root = ElementTree.Element('reply')
+        error_root.append(self._generate_error())
+        self._zmq_error_reply = ElementTree.tostring(error_root)
+
     def _generate_error(self, msg=None):
         """Generate an XML error element (with the given message if
         specified).
@@ -105,10 +171,17 @@ class ZMQRPC(object):
         :param string msg: the (XML) message to be handled.
 
         """
-        emsg = ("Received message of type '{msg_type}', no callable found.")
-
         # Everything received over ZMQ should be XML
-        root = ElementTree.XML(msg)
+        return self._handle_zmq_xml(ElementTree.XML(msg))
+
+    def _handle_zmq_xml(self, root):
+        """Handle a message received over ZMQ that has already been parsed.
+
+        :param root: the root element of the message to be handled.
+        :type root: an :class:`xml.etree.ElementTree.Element` instance.
+
+        """
+        emsg = ("Received message of type '{msg_type}', no callable found.")
 
         # Special case - registration
         if root.tag == 'register':
@@ -120,12 +193,28 @@ class ZMQRPC(object):
 
         # Everything else (i.e request/reply)
         for elem in root:
-            fn_name = '_handle_{root}_{elem}'.format(
-              root=root.tag, elem=elem.tag
-            )
-            fn = getattr(self, fn_name, None)
+            fn = getattr(self, _get_handler_name(root.tag, elem.tag), None)
             if fn and callable(fn):
                 return fn(root, elem)
             else:
                 msg_type = '{rt}->{elem}'.format(rt=root.tag, elem=elem.tag)
                 raise ZMQRPCError(emsg.format(msg_type=msg_type))
+
+    def _send_termination(self):
+        """Tell the reply thread to stop (see _bind_termination_socket())."""
+        self._zmq_termination_push_socket.send(b'TERMINATE')
+
+    @staticmethod
+    def _serialise_reply(reply):
+        """Return the bytes to send over ZMQ for a reply. Handlers either
+        return a pre-serialised reply (e.g. _zmq_pong_reply) or an element.
+
+        >>> ZMQRPC._serialise_reply(b'<reply><pong /></reply>')
+        b'<reply><pong /></reply>'
+        >>> ZMQRPC._serialise_reply(ElementTree.Element('reply'))
+        b'<reply />'
+
+        """
+        if isinstance(reply, bytes):
+            return reply
+        return ElementTree.tostring(reply)
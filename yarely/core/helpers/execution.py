@@ -22,6 +22,27 @@ log = logging.getLogger(__name__)
 SLEEP_INTERVAL = 30
 
 
+def run_in_background(executor, fn, **kwargs):
+    """Run fn with the given keyword arguments on one of executor's worker
+    threads. Exceptions are logged (the future holding them is otherwise
+    never looked at).
+
+    :param executor: the executor to submit fn to.
+    :type executor: a :class:`concurrent.futures.Executor` instance.
+    :param callable fn: the callable to run.
+
+    """
+    def _log_exception(future):
+        if future.exception() is not None:
+            log.error(
+                "Background task {} failed".format(fn),
+                exc_info=future.exception()
+            )
+
+    future = executor.submit(fn, **kwargs)
+    future.add_done_callback(_log_exception)
+
+
 def application_loop(concrete, *args, **kwargs):
     """Main entry point - creates a new Application instance (whose specific
     implementation is provided by concrete) and starts execution. Listens
@@ -18,6 +18,34 @@ import __main__
 
 CLEAN_FILENAME_RE = re.compile('[^a-zA-Z0-9.]')
 
+# The main module never changes within a process, so the cleaned application
+# name is computed once (on first use) and shared by every handler.
+_APPLICATION_NAME = None
+
+
+def _get_application_name():
+    """Return the cleaned-up name of the main application module."""
+    global _APPLICATION_NAME
+    if _APPLICATION_NAME is not None:
+        return _APPLICATION_NAME
+
+    # Small bodge to make sure we get different filenames for processes
+    # within the same package
+    application_name = CLEAN_FILENAME_RE.sub('_', __main__.__file__)
+
+    # Little cleanup to shorten names a bit
+    usual_path_start_string = '_yarely_'
+    index_of_usual_path_start_string = application_name.rfind(
+      usual_path_start_string
+    )
+    if index_of_usual_path_start_string >= 0:
+        application_name = application_name[
+          index_of_usual_path_start_string+1:
+        ]
+
+    _APPLICATION_NAME = application_name
+    return _APPLICATION_NAME
+
 
 class TimedRotatingFileHandlerWithApplicationName(TimedRotatingFileHandler):
     """A TimedRotatingFileHandler that is aware of the main application's name.
@@ -32,23 +60,9 @@ class TimedRotatingFileHandlerWithApplicationName(TimedRotatingFileHandler):
     """
 
     def __init__(self, filename, *args, **kwargs):
-        # Small bodge to make sure we get different filenames for processes
-        # within the same package
-        application_name = CLEAN_FILENAME_RE.sub('_', __main__.__file__)
-
-        # Little cleanup to shorten names a bit
-        usual_path_start_string = '_yarely_'
-        index_of_usual_path_start_string = application_name.rfind(
-          usual_path_start_string
-        )
-        if index_of_usual_path_start_string >= 0:
-            application_name = application_name[
-              index_of_usual_path_start_string+1:
-            ]
-
         # Coerce the names to strings because in some odd cases one of them
         # ends up as None
         # 13 Nov 2013 -- do we need this anymore??
-        filename = filename.format(application_name=application_name)
+        filename = filename.format(application_name=_get_application_name())
 
         super().__init__(filename, *args, **kwargs)
@@ -9,58 +9,16 @@
 # For full licensing information see /LICENSE.
 
 
-"""
+r"""
 
 The Yarely platform module.
 Provides platform-specfic functionality that is common to all OSes.
 
-"""
-
+Functions
+---------
 
-# Standard library imports
-import importlib as _importlib
-import sys as _sys
-
-
-class PlatformError(Exception):
-    """Base class for platform errors"""
-    pass
-
-
-# Map the platform (sys.platform - key), to the module name that provides
-# the concrete implementation (value).
-#
-# Linux has multiple entries because:
-#   python < 3.2 reports 'linux2' or 'linux3'
-#   python = 3.2 reports 'linux2'
-#   python > 3.2 reports 'linux'
-_PLATFORM_MODULE_MAP = {
-    "darwin": "darwin",
-    "linux": "linux", "linux2": "linux", "linux3": "linux",
-    "win32": "win32"
-}
-
-_UNSUPPORTED_PLATFORM_TEMPLATE = "Platform '{platform}' is not supported"
-_MODULE_PATH_TEMPLATE = "yarely.core.platform.{module}"
-
-if _sys.platform not in _PLATFORM_MODULE_MAP:
-    _msg = _UNSUPPORTED_PLATFORM_TEMPLATE.format(platform=_sys.platform)
-    raise NotImplementedError(_msg)
-
-
-_module = _PLATFORM_MODULE_MAP[_sys.platform]
-_module_path = _MODULE_PATH_TEMPLATE.format(module=_module)
-
-_concrete = _importlib.import_module(_module_path)
-
-
-# Actual implementation follows
-# By design we provide the docstring here so it doesn't need to be duplicated
-# for each supported OS
-
-
-def get_available_space_in_bytes(path):
-    r"""Return the number of bytes available in the given path.
+get_available_space_in_bytes(path)
+    Return the number of bytes available in the given path.
 
     The meaning of 'available' varies between host platforms but the
     intention is to return the writable space available to this process
@@ -82,12 +40,8 @@ def get_available_space_in_bytes(path):
       >>> get_available_space_in_bytes("c:\\")   # doctest: +SKIP
       1435425335
 
-    """
-    return _concrete.get_available_space_in_bytes(path=path)
-
-
-def get_local_path_from_uri(uri):
-    """Return a local file path from the specified file URI.
+get_local_path_from_uri(uri)
+    Return a local file path from the specified file URI.
 
     :param string uri: a URI representing a local file. The URI should begin
         with the file scheme (e.g. 'file://path/to/file').
@@ -101,12 +55,8 @@ def get_local_path_from_uri(uri):
         >>> get_local_path_from_uri(path)                # doctest: +SKIP
         'c:\\WINDOWS\\clock.avi'
 
-    """
-    return _concrete.get_local_path_from_uri(uri=uri)
-
-
-def get_uri_from_local_path(path):
-    """Return a file URI for the specified local file.
+get_uri_from_local_path(path)
+    Return a file URI for the specified local file.
 
     :param string uri: a local file path.
     :return: a URI representing a local file (e.g. 'file://path/to/file').
@@ -118,5 +68,58 @@ def get_uri_from_local_path(path):
         >>> get_uri_from_local_path('c:\\WINDOWS\\clock.avi') # doctest: +SKIP
         'file:///c:/WINDOWS/clock.avi'
 
+"""
+
+
+# Standard library imports
+import importlib as _importlib
+import sys as _sys
+
+
+class PlatformError(Exception):
+    """Base class for platform errors"""
+    pass
+
+
+_UNSUPPORTED_PLATFORM_TEMPLATE = "Platform '{platform}' is not supported"
+_MODULE_PATH_TEMPLATE = "yarely.core.platform.{module}"
+
+
+def _get_platform_module_name(platform):
+    """Return the name of the module that provides the concrete
+    implementation for the given platform (as reported by sys.platform), or
+    None if the platform is not supported.
+
+    Linux is matched by prefix because:
+      python < 3.2 reports 'linux2' or 'linux3'
+      python = 3.2 reports 'linux2'
+      python > 3.2 reports 'linux'
+
     """
-    return _concrete.get_uri_from_local_path(path=path)
+    if platform == "darwin":
+        return "darwin"
+    if platform == "win32":
+        return "win32"
+    if platform.startswith("linux"):
+        return "linux"
+    return None
+
+
+_module = _get_platform_module_name(_sys.platform)
+
+if _module is None:
+    _msg = _UNSUPPORTED_PLATFORM_TEMPLATE.format(platform=_sys.platform)
+    raise NotImplementedError(_msg)
+
+_module_path = _MODULE_PATH_TEMPLATE.format(module=_module)
+
+_concrete = _importlib.import_module(_module_path)
+
+
+# The public functions are bound directly to their concrete implementations
+# so that a call costs a single global lookup. They are documented in the
+# module docstring above so that the docstring doesn't need to be duplicated
+# for each supported OS.
+get_available_space_in_bytes = _concrete.get_available_space_in_bytes
+get_local_path_from_uri = _concrete.get_local_path_from_uri
+get_uri_from_local_path = _concrete.get_uri_from_local_path
@@ -12,36 +12,48 @@
 """Platform specific methods that are common across POSIX platforms"""
 
 # Standard library imports
-import os
+import functools
 import os.path
+import shutil
 import urllib.parse
 
 # Local imports
 from yarely.core.platform import PlatformError
+from yarely.core.platform.common_uri import (
+    LOCAL_FILE_URI_PREFIX, URI_CONVERSION_CACHE_SIZE, is_plain_local_file_uri
+)
 
 
 def get_available_space_in_bytes(path):
     """Return the number of bytes available in the given path."""
-    vfs_stats = os.statvfs(path)
-    available_space_in_bytes = vfs_stats.f_bavail * vfs_stats.f_frsize
-    return available_space_in_bytes
+    return shutil.disk_usage(path).free
 
 
+@functools.lru_cache(maxsize=URI_CONVERSION_CACHE_SIZE)
 def get_local_path_from_uri(uri):
     """Return a local file path from the specified file URI."""
-    parse_result = urllib.parse.urlparse(uri)
-    if parse_result.scheme != 'file':
+    if is_plain_local_file_uri(uri):
+        # Keep the leading '/' of the path.
+        return urllib.parse.unquote(uri[len(LOCAL_FILE_URI_PREFIX)-1:])
+
+    split_result = urllib.parse.urlsplit(uri)
+    if split_result.scheme != 'file':
         raise PlatformError('URI must have scheme of type file')
-    quoted_path = parse_result.path
+    quoted_path = split_result.path
     return urllib.parse.unquote(quoted_path)
 
 
 def get_uri_from_local_path(path):
     """Return a file URI for the specified local file."""
-    abs_path = os.path.abspath(path)
+    # The absolute path depends on the current working directory, so only
+    # the conversion that follows is cached.
+    return _get_uri_from_abs_path(os.path.abspath(path))
+
+
+@functools.lru_cache(maxsize=URI_CONVERSION_CACHE_SIZE)
+def _get_uri_from_abs_path(abs_path):
     quoted_path = urllib.parse.quote(abs_path)
-    parse_result = urllib.parse.ParseResult(
-      scheme='file', netloc='', path=quoted_path, params='', query='',
-      fragment=''
+    split_result = urllib.parse.SplitResult(
+      scheme='file', netloc='', path=quoted_path, query='', fragment=''
     )
-    return urllib.parse.urlunparse(parse_result)
+    return urllib.parse.urlunsplit(split_result)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2016 Lancaster University.
+#
+#
+# This file is part of Yarely.
+#
+# Licensed under the Apache License, Version 2.0.
+# For full licensing information see /LICENSE.
+
+
+"""URI conversion helpers that are common across all platforms"""
+
+
+# Number of URI/path conversions to remember. The scheduler converts the
+# same handful of content URIs over and over again.
+URI_CONVERSION_CACHE_SIZE = 4096
+
+# Local file URIs are almost always of the form 'file:///path/to/file' (or
+# 'file:///c:/path/to/file' on Windows). Those can be converted with plain
+# string operations, as long as they contain none of the characters that
+# urlsplit() treats specially.
+LOCAL_FILE_URI_PREFIX = 'file:///'
+
+
+def is_plain_local_file_uri(uri):
+    """Return True if uri is a local file URI that can be converted without
+    urlsplit().
+
+    >>> is_plain_local_file_uri('file:///etc/fstab')
+    True
+    >>> is_plain_local_file_uri('file:///etc/fstab#fragment')
+    False
+    >>> is_plain_local_file_uri('http://example.com/')
+    False
+
+    """
+    # urlsplit() separates off queries and fragments and drops tabs and
+    # newlines; a handful of 'in' tests is cheaper than a regex here.
+    return (
+        uri.startswith(LOCAL_FILE_URI_PREFIX) and '?' not in uri and
+        '#' not in uri and '\t' not in uri and '\r' not in uri and
+        '\n' not in uri
+    )
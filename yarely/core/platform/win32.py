@@ -12,6 +12,7 @@
 """Platform specific methods for the win32 platform"""
 
 # Standard library imports
+import functools
 import urllib.parse
 
 # Third party imports
@@ -19,6 +20,9 @@ import win32file
 
 # Local imports
 from yarely.core.platform import PlatformError
+from yarely.core.platform.common_uri import (
+    LOCAL_FILE_URI_PREFIX, URI_CONVERSION_CACHE_SIZE, is_plain_local_file_uri
+)
 
 
 def get_available_space_in_bytes(path):
@@ -48,25 +52,31 @@ def get_available_space_in_bytes(path):
     return win32file.GetDiskFreeSpaceEx(path)[0]
 
 
+@functools.lru_cache(maxsize=URI_CONVERSION_CACHE_SIZE)
 def get_local_path_from_uri(uri):
     """Return a local file path from the specified file URI."""
-    # On Windows, urllib.parse.urlparse() doesn't return a path with
+    if is_plain_local_file_uri(uri):
+        path = uri[len(LOCAL_FILE_URI_PREFIX):]
+        return path.lstrip('/').replace('/', '\\')
+
+    # On Windows, urllib.parse.urlsplit() doesn't return a path with
     # forward slashes so we put them in before we return the value.
     # Windows also keeps the localhost '/' in at the start of path
     # so we chop this off before the replace operation.
-    parse_result = urllib.parse.urlparse(uri)
-    if parse_result.scheme != 'file':
+    split_result = urllib.parse.urlsplit(uri)
+    if split_result.scheme != 'file':
         raise PlatformError('URI must have scheme of type file')
-    path = parse_result.path.lstrip('/').replace('/', '\\')
+    path = split_result.path.lstrip('/').replace('/', '\\')
     return path
 
 
+@functools.lru_cache(maxsize=URI_CONVERSION_CACHE_SIZE)
 def get_uri_from_local_path(path):
     """Return a file URI for the specified local file."""
-    # On Windows, urllib.parse.urlunparse() doesn't do the right thing with
+    # On Windows, urllib.parse.urlunsplit() doesn't do the right thing with
     # forward slashes so we replace these before we start.
     path = path.replace('\\', '/')
-    parse_result = urllib.parse.ParseResult(
-        scheme='file', netloc='', path=path, params='', query='', fragment=''
+    split_result = urllib.parse.SplitResult(
+        scheme='file', netloc='', path=path, query='', fragment=''
     )
-    return urllib.parse.urlunparse(parse_result)
+    return urllib.parse.urlunsplit(split_result)
@@ -10,7 +10,9 @@
 
 
 # Standard library imports
+import concurrent.futures
 import logging
+import selectors
 import threading
 from xml.etree import ElementTree
 
@@ -19,8 +21,9 @@ import zmq
 
 # Local (Yarely) imports
 from yarely.core.helpers.base_classes.zmq_rpc import ZMQRPC
+from yarely.core.helpers.execution import run_in_background
 from yarely.core.helpers.zmq import (
-    ZMQ_ADDRESS_INPROC,  ZMQ_ADDRESS_LOCALHOST, ZMQ_SOCKET_LINGER_MSEC,
+    ZMQ_ADDRESS_LOCALHOST, ZMQ_SOCKET_LINGER_MSEC,
     ZMQ_SENSORMANAGER_REQ_PORT, ZMQ_SUBSMANAGER_REQ_PORT
 )
 from yarely.core.scheduling.constants import CONTEXT_STORE_DEFAULT_DB_PATH
@@ -32,6 +35,12 @@ from yarely.core.subscriptions.subscription_parser import (
 )
 
 
+# Number of threads used to run work triggered by sensor updates. Item
+# scheduling (see semaphore_lock_decorator) can keep two of these busy - one
+# running and one waiting - so the third is left for the touch selection.
+SENSOR_UPDATE_WORKERS = 3
+
+
 log = logging.getLogger(__name__)
 
 
@@ -57,11 +66,52 @@ class _ContextConstraintsParser(ZMQRPC):
         # to the subscription and sensor managers.
         self._zmq_scheduler_reply_thread = None
 
+        # The subscription manager sends the whole CDS with every update, and
+        # most updates repeat the previous one. The raw message of the last
+        # subscription update passed on to the scheduler manager is kept so
+        # that repeats can be dropped before parsing (see _handle_zmq_msg()).
+        self._last_subscription_update_msg = None
+
+        # Work triggered by sensor updates runs on these threads so that we
+        # don't block on it whilst replying.
+        self._sensor_update_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=SENSOR_UPDATE_WORKERS
+        )
+
+        self._init_constant_replies()
+
         # ZMQ initialisation
         self.zmq_scheduler_term_identifier = "zmq_scheduling_term_{id}".format(
             id=id(self)
         )
         self.zmq_context = zmq.Context()
+        self._bind_termination_socket(self.zmq_scheduler_term_identifier)
+
+    def _handle_zmq_msg(self, msg):
+        """Handle a message received over ZMQ, replying straight away to a
+        repeat of the last subscription update: its CDS would be the same as
+        the one the scheduler manager already has.
+
+        :param bytes msg: the (XML) message to be handled.
+
+        """
+        if msg == self._last_subscription_update_msg:
+            log.debug("Subscription update unchanged, not parsing it.")
+            return self._zmq_pong_reply
+
+        root = ElementTree.XML(msg)
+        reply = self._handle_zmq_xml(root)
+
+        # The subscription update handler only replies with the
+        # pre-serialised pong once it has passed the update on.
+        if (
+            root.tag == 'request' and len(root) and
+            root[0].tag == 'subscription_update' and
+            reply is self._zmq_pong_reply
+        ):
+            self._last_subscription_update_msg = msg
+
+        return reply
 
     @staticmethod
     def _get_context_type(message):
@@ -95,60 +145,59 @@ class _ContextConstraintsParser(ZMQRPC):
         )
 
         # Create termination socket
-        zmq_termination_reply_socket = self.zmq_context.socket(zmq.REP)
-        zmq_termination_reply_socket.bind(
-            ZMQ_ADDRESS_INPROC.format(
-                identifier=self.zmq_scheduler_term_identifier
-            )
+        zmq_termination_pull_socket = self._connect_termination_socket()
+
+        reply_sockets = (
+            zmq_subsmanager_reply_socket, zmq_sensormanager_reply_socket
         )
 
-        # Register all sockets
-        zmq_poller = zmq.Poller()
-        zmq_poller.register(zmq_subsmanager_reply_socket, zmq.POLLIN)
-        zmq_poller.register(zmq_sensormanager_reply_socket, zmq.POLLIN)
-        zmq_poller.register(zmq_termination_reply_socket, zmq.POLLIN)
+        # Wait on the sockets' notification file descriptors. Unlike
+        # zmq.Poller, which sets up a new poll set on every call, the selector
+        # (epoll/kqueue as available) keeps its registrations between waits.
+        selector = selectors.DefaultSelector()
+        for sock in reply_sockets + (zmq_termination_pull_socket,):
+            selector.register(sock.getsockopt(zmq.FD), selectors.EVENT_READ)
 
-        # Provide a method to loop over sockets that have data. It tries to
+        def _has_data(sock):
+            return sock.getsockopt(zmq.EVENTS) & zmq.POLLIN
+
+        # Receives one request from the socket and replies to it. It tries to
         # find matching methods for incoming requests/replies with
         # _handle_zmq_msg().
-        def _loop_over_sockets():
-            term = False
-
-            for sock in socks_with_data:
-                if sock is zmq_termination_reply_socket:
-                    return True
-
-                msg = sock.recv().decode()
-                reply = self._handle_zmq_msg(msg)
-
-                # Check if we got a valid reply from the method called.
-                if reply is None:
-                    log.warning(
-                        "No reply generated, replying with error!"
-                    )
-                    reply = self._encapsulate_reply(self._generate_error())
-
-                sock.send(ElementTree.tostring(reply))
+        def _reply_to_msg(sock):
+            # ElementTree parses the raw bytes directly.
+            reply = self._handle_zmq_msg(sock.recv())
+
+            # Check if we got a valid reply from the method called.
+            if reply is None:
+                log.warning(
+                    "No reply generated, replying with error!"
+                )
+                reply = self._zmq_error_reply
 
-            return term
+            sock.send(self._serialise_reply(reply))
 
-        # Look at all incoming messages
-        while True:
-            socks_with_data = dict(zmq_poller.poll())
+        # Look at all incoming messages. The notification file descriptors
+        # only signal that the ZMQ events *may* have changed (they are edge
+        # triggered), so we check zmq.EVENTS and handle every waiting message
+        # before going back to wait on the selector.
+        while not _has_data(zmq_termination_pull_socket):
+            socks_with_data = [
+                sock for sock in reply_sockets if _has_data(sock)
+            ]
 
-            if socks_with_data:
-                term = _loop_over_sockets()
+            if not socks_with_data:
+                selector.select()
+                continue
 
-                if term:
-                    break
+            for sock in socks_with_data:
+                _reply_to_msg(sock)
 
         # Cleanup ZMQ
-        zmq_poller.unregister(zmq_subsmanager_reply_socket)
-        zmq_poller.unregister(zmq_sensormanager_reply_socket)
-        zmq_poller.unregister(zmq_termination_reply_socket)
+        selector.close()
         zmq_subsmanager_reply_socket.close()
         zmq_sensormanager_reply_socket.close()
-        zmq_termination_reply_socket.close()
+        zmq_termination_pull_socket.close()
 
     def _handle_request_sensor_update(self, msg_root, msg_elem):
         """This method is listening for sensor updates (e.g. interest counts
@@ -159,8 +208,11 @@ class _ContextConstraintsParser(ZMQRPC):
         Scheduler Manager.
         """
 
-        msg_string = ElementTree.tostring(msg_elem)
-        log.debug("Receiving sensor update: {}".format(msg_string))
+        # Serialising the update is only worth it if it gets logged.
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Receiving sensor update: {}".format(
+                ElementTree.tostring(msg_elem)
+            ))
 
         # Write the incoming XML data into the context store. We expect this to
         # be a ContentItem element.
@@ -169,23 +221,32 @@ class _ContextConstraintsParser(ZMQRPC):
         # will call the appropriate method from here.
         touch_input = msg_elem.find('touch_input')
         if touch_input is not None and touch_input.text == 'touch_button_push':
-            threading.Thread(
-                target=self.scheduler_mgr._initialise_touch_selection
-            ).start()
-            return self._encapsulate_reply(self._generate_pong())
+            run_in_background(
+                self._sensor_update_executor,
+                self.scheduler_mgr._initialise_touch_selection
+            )
+            return self._zmq_pong_reply
 
         # Parse the incoming XML into a ContentItem object and read out the
         # context type.
         parsed_content_item = self._parse_raw_context_information(msg_elem)
         context_type = self._get_context_type(msg_elem)
 
-        # Write this to the database
+        # Queue this to be written to the database so that we can reply
+        # straight away. New item scheduling gets triggered once the context
+        # information has been written, so the scheduler can see it. We want
+        # to do this in a separate thread so that we don't block the context
+        # store writer on item_scheduling.
         try:
-            self.context_store.add_context(context_type, parsed_content_item)
+            self.context_store.add_context_async(
+                context_type, parsed_content_item,
+                callback=self._trigger_item_scheduling
+            )
         except UnsupportedContextTypeError:
             log.error("Trying to write unsupported sensor update: {}".format(
-                msg_string
+                ElementTree.tostring(msg_elem)
             ))
+            self._trigger_item_scheduling()
 
         # Report on incoming sensor updates to the analytics service.
         self.scheduler_mgr.report_event(
@@ -193,12 +254,7 @@ class _ContextConstraintsParser(ZMQRPC):
             label=str(parsed_content_item)
         )
 
-        # Trigger new item scheduling after receiving new context information.
-        # We want to do this in a separate thread so that we don't block on
-        # item_scheduling.
-        threading.Thread(target=self.scheduler_mgr.item_scheduling).start()
-
-        return self._encapsulate_reply(self._generate_pong())
+        return self._zmq_pong_reply
 
     def _handle_request_subscription_update(self, msg_root, msg_elem):
         """This handles incoming updates from the subscription manager. The
@@ -215,11 +271,15 @@ class _ContextConstraintsParser(ZMQRPC):
 
         parsed_cds = self._parse_raw_cds_xml(msg_elem)
 
-        if parsed_cds is not None:
-            self.scheduler_mgr.cds_updates.put(parsed_cds)
         # FIXME: do we want to do something more if parsed_cds is None?
+        if parsed_cds is None:
+            # The subscription manager doesn't handle error replies, so this
+            # is still a pong - just not the pre-serialised one, so that
+            # _handle_zmq_msg() doesn't take the update as passed on.
+            return self._encapsulate_reply(self._generate_pong())
 
-        return self._encapsulate_reply(self._generate_pong())
+        self.scheduler_mgr.cds_updates.put(parsed_cds)
+        return self._zmq_pong_reply
 
     @staticmethod
     def _parse_raw_cds_xml(raw_cds_xml):
@@ -259,22 +319,29 @@ class _ContextConstraintsParser(ZMQRPC):
 
     def _parse_raw_context_information(self, message):
         """FIXME."""
-        if not isinstance(message, ElementTree.Element):
-            # Fixme - raise appropriate error here
-            return
-
         # We assume that each message has a wrapper around and the (one) child
         # of message is the actual ContentItem or ContentDescriptorSet.
 
-        # Sensor update... content item.
+        # Sensor update... content item. Anything that can't be indexed isn't
+        # an element (e.g. None).
+        # Fixme - raise appropriate error here
         try:
             child = message[0]
-        except IndexError:
+        except (IndexError, TypeError):
             return None
 
         content_item = self._parse_raw_content_item_xml(child)
         return content_item
 
+    def _trigger_item_scheduling(self):
+        """Trigger new item scheduling after receiving new context
+        information.
+
+        """
+        run_in_background(
+            self._sensor_update_executor, self.scheduler_mgr.item_scheduling
+        )
+
     def start(self):
         """Start listening for incoming requests/replies. The mapping from
         request to method is done in _handle_incoming_zmq.
@@ -294,17 +361,14 @@ class _ContextConstraintsParser(ZMQRPC):
         # TODO - do we want to send a 'turn off' event to the display here?
 
         # Terminate ZMQ-related threads
-        zmq_termination_request_socket = self.zmq_context.socket(zmq.REQ)
-        zmq_termination_request_socket.setsockopt(
-            zmq.LINGER, ZMQ_SOCKET_LINGER_MSEC
-        )
-        zmq_termination_request_socket.connect(
-            ZMQ_ADDRESS_INPROC.format(
-                identifier=self.zmq_scheduler_term_identifier
-            )
-        )
-        zmq_termination_request_socket.send_unicode('TERMINATE')
-        zmq_termination_request_socket.close()
+        self._send_termination()
         self._zmq_scheduler_reply_thread.join()
 
+        # No more sensor updates can come in now. Write those still queued
+        # (their callbacks trigger item scheduling on the executor), then wait
+        # for any work they triggered to finish.
+        self.context_store.close()
+        self._sensor_update_executor.shutdown()
+
+        self._zmq_termination_push_socket.close()
         self.zmq_context.term()
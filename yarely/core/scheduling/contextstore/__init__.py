@@ -12,8 +12,10 @@
 # Standard library imports
 import datetime
 import logging
+import queue
 import re
 import sqlite3
+import threading
 from xml.etree import ElementTree as ET
 
 # Internal Yarely imports
@@ -24,47 +26,66 @@ from yarely.core.scheduling.contextstore.constants import (
 from yarely.core.subscriptions.subscription_parser import ContentItem
 
 
+# Column type used to have sqlite3 convert datetime columns for us (see
+# _convert_context_datetime). Columns are tagged with it in the SELECT
+# statements as 'column AS "column [context_datetime]"'.
+CONTEXT_DATETIME_TYPE = 'context_datetime'
+
 # SQLite commands
+# The table name is substituted once here; all values are passed as query
+# parameters so SQLite can reuse its prepared statements.
 CREATE_CONTEXT_TABLE = (
     "CREATE TABLE IF NOT EXISTS {table} ("
     "context_id INTEGER PRIMARY KEY, created DATETIME DEFAULT "
     "CURRENT_TIMESTAMP, context_type TEXT, content_item_xml TEXT)"
-)
+).format(table=CONTEXT_TABLE_NAME)
+# All queries select by context type, most of them ordered by creation date.
+CREATE_CONTEXT_TYPE_CREATED_INDEX = (
+    "CREATE INDEX IF NOT EXISTS {table}_context_type_created "
+    "ON {table} (context_type, created DESC)"
+).format(table=CONTEXT_TABLE_NAME)
 
 INSERT_CONTEXT_RECORD = (
     "INSERT INTO {table} (context_type, content_item_xml) "
-    "VALUES ('{context_type}', '{content_item_xml}')"
-)
-SELECT_CONTEXT_RECORD_ORDER_BY_DATE = (
-    "SELECT context_type, content_item_xml, created, "
-    "datetime(created, 'localtime') AS created_localtime "
-    "FROM {table} "
-    "WHERE {where_clause} "
-    "ORDER BY created {order} "
-    "LIMIT {limit}"
-)
+    "VALUES (?, ?)"
+).format(table=CONTEXT_TABLE_NAME)
 SELECT_CONTEXT_RECORD_BY_TYPE_ORDER_BY_DATE_DESC = (
-    SELECT_CONTEXT_RECORD_ORDER_BY_DATE.format(
-        where_clause="context_type == '{context_type}'", order="DESC",
-        table='{table}', limit="{limit}"
-    )
-)
+    "SELECT context_type, content_item_xml, "
+    "created AS \"created [{datetime_type}]\", "
+    "datetime(created, 'localtime') "
+    "AS \"created_localtime [{datetime_type}]\" "
+    "FROM {table} "
+    "WHERE context_type == ? "
+    "ORDER BY created DESC "
+    "LIMIT ?"
+).format(table=CONTEXT_TABLE_NAME, datetime_type=CONTEXT_DATETIME_TYPE)
 SELECT_CONTEXT_RECORD_BY_TYPE_GROUP_BY_ORDER_BY_DATE = (
     "SELECT content_item_xml, count(*) as num_of_entries "
     "FROM {table} "
-    "WHERE context_type == '{context_type}' "
-    "AND created > '{created}' "
-    "GROUP BY {group_by} "
+    "WHERE context_type == ? "
+    "AND created > ? "
+    "GROUP BY content_item_xml "
     "ORDER BY num_of_entries ASC "
-    "LIMIT {limit}"
-)
+    "LIMIT ?"
+).format(table=CONTEXT_TABLE_NAME)
 SELECT_CONTEXT_RECORD_BY_TYPE_MOST_RECENT = (
     "SELECT DISTINCT content_item_xml "
     "FROM {table} "
-    "WHERE context_type == '{context_type}' "
+    "WHERE context_type == ? "
     "ORDER BY rowid DESC "
-    "LIMIT {limit}"
-)
+    "LIMIT ?"
+).format(table=CONTEXT_TABLE_NAME)
+
+# Matches all \n followed by whitespace.
+CONTENT_ITEM_WHITESPACE_RE = re.compile(r'\n\s*')
+
+# Maximum number of queued context records written in one transaction by the
+# background writer (see ContextStore.add_context_async).
+CONTEXT_WRITER_MAX_BATCH_SIZE = 256
+
+# Queued by close() to tell the background writer to stop once it has
+# written everything queued before it.
+_STOP_WRITER = object()
 
 # Each context type will get its own table in the database?
 CONTEXT_TYPE = (
@@ -76,6 +97,58 @@ CONTEXT_TYPE = (
 log = logging.getLogger(__name__)
 
 
+def _convert_context_datetime(value):
+    """Convert a datetime as stored by SQLite (b'2015-06-19 10:11:21') into a
+    datetime object. Slicing the fixed format is considerably cheaper than
+    datetime.strptime.
+
+    >>> _convert_context_datetime(b'2015-06-19 10:11:21')
+    datetime.datetime(2015, 6, 19, 10, 11, 21)
+
+    """
+    return datetime.datetime(
+        int(value[0:4]), int(value[5:7]), int(value[8:10]),
+        int(value[11:13]), int(value[14:16]), int(value[17:19])
+    )
+
+
+sqlite3.register_converter(CONTEXT_DATETIME_TYPE, _convert_context_datetime)
+
+
+class _ContextRecord(dict):
+    """A row read from the context store.
+
+    Parsing content_item_xml into a ContentItem is comparatively expensive
+    and many queries never look at the result, so the 'content_item' key is
+    only filled in the first time it is looked up (it will be None if there
+    is no content item XML or it cannot be parsed).
+
+    >>> record = _ContextRecord(content_item_xml=None)
+    >>> 'content_item' in record
+    False
+    >>> record['content_item'] is None
+    True
+    >>> 'content_item' in record
+    True
+
+    """
+
+    def __missing__(self, key):
+        if key != 'content_item' or 'content_item_xml' not in self:
+            raise KeyError(key)
+
+        content_item = None
+        if self['content_item_xml']:
+            try:
+                content_item_xml = ET.fromstring(self['content_item_xml'])
+                content_item = ContentItem(content_item_xml)
+            except ET.ParseError:
+                pass
+
+        self['content_item'] = content_item
+        return content_item
+
+
 class UnsupportedContextTypeError(Exception):
     """ This error gets raised when an unsupported or unknown context type is
     supposed to be either read from the context store or written into it.
@@ -88,7 +161,9 @@ class ContextStore(object):
     underlying database used.
 
     SQLite3 for Python allows to access a database file by multiple processes
-    and threads.
+    and threads. Each ContextStore keeps a single connection open for its
+    lifetime; access to it is serialised with a lock so instances can be
+    shared between threads.
     """
 
     def __init__(self, db_path):
@@ -97,8 +172,18 @@ class ContextStore(object):
 
         """
         self.db_path = db_path
+        self._db_connection = None
+        self._db_lock = threading.Lock()
         self._initialise_database()
 
+        # Records queued by add_context_async() and the thread that writes
+        # them. The thread is only started once something is queued; records
+        # are queued under _writer_thread_lock so none can be queued behind
+        # close()'s stop marker.
+        self._write_queue = queue.Queue()
+        self._writer_thread = None
+        self._writer_thread_lock = threading.Lock()
+
     @staticmethod
     def _convert_content_item_to_str(content_item):
         """ Convert ContentItem objects to one-line string. Get rid of any
@@ -108,75 +193,136 @@ class ContextStore(object):
         # Fixme (low priority) - this sometimes doesn't shorten correctly.
         content_item_str = content_item.get_xml()
 
+        # Nothing to clean up if the XML is on one line already (e.g. content
+        # items that were generated rather than parsed from a subscription).
+        if '\n' not in content_item_str:
+            return content_item_str
+
         # Cleanup entries as there is usually a lot of whitespace between XML
         # entries and get rid of the spare new line - outputs everything in
         # one line which should also make queries easier.
-        # Matches all \n followed by whitespace.
-        pattern = r'\n[\s]*'
-        regex = re.compile(pattern)
-        cleaned_output = regex.sub('', content_item_str)
+        cleaned_output = CONTENT_ITEM_WHITESPACE_RE.sub('', content_item_str)
 
         return cleaned_output
 
+    def _get_content_item_xml(self, content_item):
+        # Sometimes content_item might be empty. Then we just save an empty
+        # value to the context store so that the context_type event gets
+        # stored.
+        if not content_item:
+            return None
+        return self._convert_content_item_to_str(content_item)
+
     def _initialise_database(self):
-        # Create file if not exists
+        # Open the connection that is used for the lifetime of this instance
+        # (sqlite3 creates the database file if it doesn't exist yet).
         # Todo: check write permissions here!
-        open(self.db_path, 'a').close()
-
-        # Create tables if not exist
-        db_connection = sqlite3.connect(self.db_path)
-
-        with db_connection:
-            db_connection.executescript(CREATE_CONTEXT_TABLE.format(
-                table=CONTEXT_TABLE_NAME
-            ))
-        db_connection.close()
-
-    def _exec_select_query(self, sql):
-        # Todo: check if db_path exists?
-        db_connection = sqlite3.connect(self.db_path)
-
-        with db_connection:
-            # Fetch the entries by row
-            db_connection.row_factory = self._dict_factory
-            db_cursor = db_connection.cursor()
-            db_cursor.execute(sql)
-            rows = db_cursor.fetchall()
+        # Autocommit mode (isolation_level=None) means every statement is
+        # committed straight away, as before. WAL lets readers in other
+        # connections carry on while a sensor update is being written.
+        db_connection = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None,
+            detect_types=sqlite3.PARSE_COLNAMES
+        )
+        db_connection.execute("PRAGMA journal_mode=WAL")
+        db_connection.execute("PRAGMA synchronous=NORMAL")
+        db_connection.execute("PRAGMA temp_store=MEMORY")
+
+        # Create tables and indices if not exist
+        db_connection.execute(CREATE_CONTEXT_TABLE)
+        db_connection.execute(CREATE_CONTEXT_TYPE_CREATED_INDEX)
+        self._db_connection = db_connection
+
+    def _exec_select_query(self, sql, parameters=()):
+        with self._db_lock:
+            db_cursor = self._db_connection.execute(sql, parameters)
+
+            # Fetch the entries by row. The column names are the same for
+            # every row so we only look them up once.
+            columns = [col[0] for col in db_cursor.description]
+            rows = [self._dict_factory(columns, row) for row in db_cursor]
             db_cursor.close()
-        db_connection.close()
 
         return rows
 
-    @staticmethod
-    def _dict_factory(cursor, row):
-        # Convert SQLite row to dict - from Python doc.
-        # content_item_xml gets converted into a ContentItem object
-        d = {}
-        for idx, col in enumerate(cursor.description):
-            d[col[0]] = row[idx]
-
-            # Handling ContentItem objects
-            if col[0] == 'content_item_xml':
-                if not d[col[0]]:
-                    d['content_item'] = None
-                    continue
+    def _start_writer_thread(self):
+        # Called with _writer_thread_lock held.
+        if self._writer_thread is not None:
+            return
 
-                try:
-                    content_item_xml = ET.fromstring(d[col[0]])
-                    content_item = ContentItem(content_item_xml)
-                    d['content_item'] = content_item
-                except ET.ParseError:
-                    d['content_item'] = None
-
-            # Handling created and created_localtime objects.
-            if col[0].startswith('created'):
-                # 2015-06-19 10:11:21
-                tmp_datetime = datetime.datetime.strptime(
-                    d[col[0]], "%Y-%m-%d %H:%M:%S"
+        self._writer_thread = threading.Thread(
+            target=self._write_queued_context
+        )
+        self._writer_thread.name = 'Context Store Writer Thread'
+        self._writer_thread.daemon = True
+        self._writer_thread.start()
+
+    def _write_context_batch(self, batch):
+        """Write a batch of queued records in a single transaction, then call
+        their callbacks; the same callback queued by several records in the
+        batch is only called once. Callbacks are called even if the write
+        failed so that the work they trigger (e.g. item scheduling) still
+        happens.
+
+        """
+        try:
+            records = [
+                (context_type, self._get_content_item_xml(content_item))
+                for (context_type, content_item, _) in batch
+            ]
+            with self._db_lock, self._db_connection:
+                self._db_connection.execute("BEGIN")
+                self._db_connection.executemany(
+                    INSERT_CONTEXT_RECORD, records
                 )
-                d[col[0]] = tmp_datetime
+        except Exception:
+            log.exception(
+                "Failed to write {} context records".format(len(batch))
+            )
+        else:
+            log.debug("Added {} context records".format(len(batch)))
+
+        callbacks = dict.fromkeys(
+            callback for (_, _, callback) in batch if callback is not None
+        )
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                log.exception("Context store write callback failed")
 
-        return d
+    def _write_queued_context(self):
+        """Drain the write queue, writing the records that are waiting in
+        batches (see _write_context_batch()), until the stop marker queued by
+        close() is reached.
+
+        """
+        stop = False
+        while not stop:
+            batch = []
+            entry = self._write_queue.get()
+            while True:
+                if entry is _STOP_WRITER:
+                    stop = True
+                    break
+                batch.append(entry)
+                if len(batch) >= CONTEXT_WRITER_MAX_BATCH_SIZE:
+                    break
+                try:
+                    entry = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_context_batch(batch)
+
+    @staticmethod
+    def _dict_factory(columns, row):
+        # Convert SQLite row to dict. The created and created_localtime
+        # columns have already been converted into datetime objects by
+        # sqlite3; content_item_xml gets converted into a ContentItem object
+        # when 'content_item' is first looked up (see _ContextRecord).
+        return _ContextRecord(zip(columns, row))
 
     def add_context(self, context_type, content_item):
         """ Write new context/sensor information into the context store. This
@@ -194,29 +340,15 @@ class ContextStore(object):
         if context_type not in CONTEXT_TYPE:
             raise UnsupportedContextTypeError()
 
-        # Sometimes content_item might be empty. Then we just save an empty
-        # string to the context store so that the context_type event gets
-        # stored.
-        content_item_xml = None
-        if content_item:
-            content_item_xml = self._convert_content_item_to_str(content_item)
-
-        # Connect to the database and build the SQL query.
-        db_connection = sqlite3.connect(self.db_path)
-        db_cursor = db_connection.cursor()
+        content_item_xml = self._get_content_item_xml(content_item)
 
         # Insert the data
-        with db_connection:
-            sql = INSERT_CONTEXT_RECORD.format(
-                context_type=context_type, content_item_xml=content_item_xml,
-                table=CONTEXT_TABLE_NAME
+        with self._db_lock:
+            db_cursor = self._db_connection.execute(
+                INSERT_CONTEXT_RECORD, (context_type, content_item_xml)
             )
-            db_cursor.execute(sql)
             row_id = db_cursor.lastrowid
-
-        # Cleanup
-        db_cursor.close()
-        db_connection.close()
+            db_cursor.close()
 
         log.debug(
             "Added context information: content item: '{content_item}'"
@@ -227,6 +359,44 @@ class ContextStore(object):
         )
         return row_id
 
+    def add_context_async(self, context_type, content_item, callback=None):
+        """ Queue new context/sensor information to be written into the
+        context store and return immediately. Queued records are written by a
+        background thread, in batches, in the order they were queued. This
+        method is thread safe.
+
+        :param string context_type: FIXME.
+        :param content_item: FIXME.
+        :type content_item: a :class:`ContentItem` object.
+        :param callback: optional callable (taking no arguments) to be called
+            from the writer thread once the record has been written.
+
+        """
+        # Stop here if we don't support the context type.
+        if context_type not in CONTEXT_TYPE:
+            raise UnsupportedContextTypeError()
+
+        with self._writer_thread_lock:
+            self._start_writer_thread()
+            self._write_queue.put((context_type, content_item, callback))
+
+    def close(self):
+        """ Write any records queued by add_context_async() (calling their
+        callbacks), stop the background writer and close the database
+        connection. The context store can't be used afterwards.
+        """
+        with self._writer_thread_lock:
+            writer_thread = self._writer_thread
+            self._writer_thread = None
+            if writer_thread is not None:
+                self._write_queue.put(_STOP_WRITER)
+
+        if writer_thread is not None:
+            writer_thread.join()
+
+        with self._db_lock:
+            self._db_connection.close()
+
     def get_latest_context_by_type(self, context_type, n=1):
         """Returns the most recent n (default is 1) elements of a specified
         context_type from the context store.
@@ -242,10 +412,9 @@ class ContextStore(object):
         if context_type not in CONTEXT_TYPE:
             raise UnsupportedContextTypeError()
 
-        sql = SELECT_CONTEXT_RECORD_BY_TYPE_ORDER_BY_DATE_DESC.format(
-            context_type=context_type, limit=n, table=CONTEXT_TABLE_NAME,
+        rows = self._exec_select_query(
+            SELECT_CONTEXT_RECORD_BY_TYPE_ORDER_BY_DATE_DESC, (context_type, n)
         )
-        rows = self._exec_select_query(sql)
         return rows
 
     def get_latest_content_items_by_context_type(self, context_type, n=1):
@@ -275,11 +444,12 @@ class ContextStore(object):
         :return: FIXME.
 
         """
-        sql = SELECT_CONTEXT_RECORD_BY_TYPE_GROUP_BY_ORDER_BY_DATE.format(
-            table=CONTEXT_TABLE_NAME, context_type=context_type,
-            created=until_datetime, group_by='content_item_xml', limit=n
+        # The created column is compared as text, so pass the same string
+        # representation that used to be embedded in the query.
+        return self._exec_select_query(
+            SELECT_CONTEXT_RECORD_BY_TYPE_GROUP_BY_ORDER_BY_DATE,
+            (context_type, str(until_datetime), n)
         )
-        return self._exec_select_query(sql)
 
     def get_latest_content_item_played(
             self, context_type, until_datetime, n=1000
@@ -294,8 +464,6 @@ class ContextStore(object):
         :return: FIXME.
 
         """
-        sql = SELECT_CONTEXT_RECORD_BY_TYPE_MOST_RECENT.format(
-            table=CONTEXT_TABLE_NAME, context_type=context_type,
-            limit=n
+        return self._exec_select_query(
+            SELECT_CONTEXT_RECORD_BY_TYPE_MOST_RECENT, (context_type, n)
         )
-        return self._exec_select_query(sql)
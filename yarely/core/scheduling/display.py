@@ -10,12 +10,16 @@
 
 
 # Standard library imports
+import concurrent.futures
+import heapq
+import itertools
 import logging
 import os
 import threading
 import time
 import uuid
 from xml.etree import ElementTree
+from xml.sax.saxutils import quoteattr
 
 # Third party imports
 import zmq
@@ -25,8 +29,9 @@ from yarely.core.helpers.base_classes.manager import (
     SubprocessExecutionWithErrorCapturing
 )
 from yarely.core.helpers.base_classes.zmq_rpc import ZMQRPC
+from yarely.core.helpers.execution import run_in_background
 from yarely.core.helpers.zmq import (
-    ZMQ_ADDRESS_INPROC, ZMQ_ADDRESS_LOCALHOST, ZMQ_RENDERER_REQ_PORT,
+    ZMQ_ADDRESS_LOCALHOST, ZMQ_RENDERER_REQ_PORT,
     ZMQ_SOCKET_LINGER_MSEC
 )
 from yarely.core import platform
@@ -39,6 +44,26 @@ from yarely.core.content import (
 log = logging.getLogger(__name__)
 DEFAULT_POSITION = 0
 
+# Number of threads used to display items and trigger item scheduling. Item
+# scheduling (see semaphore_lock_decorator) can keep two of these busy - one
+# running and one waiting - so the third is left for displaying items.
+DISPLAY_WORKERS = 3
+
+# Address the display manager listens on for renderer messages.
+RENDERER_ZMQ_ADDRESS = ZMQ_ADDRESS_LOCALHOST.format(port=ZMQ_RENDERER_REQ_PORT)
+
+# Templates for the reply to a renderer registration. The schema is fixed, so
+# we format the reply directly rather than building an ElementTree for it.
+PARAMS_REPLY_TEMPLATE = (
+    '<reply><params><param name="token" value="UNUSED" />{params}'
+    '</params></reply>'
+)
+PARAM_TEMPLATE = '<param name={name} value={value} />'
+
+# Items whose URI starts with one of these are passed to renderers as they
+# are, anything else is treated as a local path and converted to a file URI.
+URI_SCHEME_PREFIXES = ('http', 'udp', 'file', 'rtmp')
+
 
 class RendererError(Exception):
     """FIXME."""
@@ -64,7 +89,7 @@ class ExecutingRenderer(object):
         :param is_visible: True indicates that the renderer is currently
         visible on the screen, False otherwise.
         :param active_timestamp: time at which the content item became visible
-        on the screen.
+        on the screen (a time.monotonic() value).
         :return:
         """
         self.content_item = content_item
@@ -97,7 +122,8 @@ class DisplayManager(ZMQRPC):
     parameters. Please see content_item for more detail.
 
     This class holds references to all running renderers and maintains access
-    to these references in a manner that is thread-safe. Further it maintains
+    to these references in a manner that is thread-safe (changes are made
+    under a lock, lookups read the dictionaries directly). Further it maintains
     only one visible renderer at a position - all other renderers will be
     stopped and removed.
 
@@ -108,6 +134,10 @@ class DisplayManager(ZMQRPC):
     triggered to find a new item.
     """
 
+    # Path to the module starter script (see
+    # _get_yarely_module_starter_path()).
+    _yarely_module_starter_path = None
+
     def __init__(self, scheduler_mgr):
         """
         :param scheduler_mgr: FIXME.
@@ -117,11 +147,20 @@ class DisplayManager(ZMQRPC):
         self.scheduler_mgr = scheduler_mgr
         self._zmq_display_renderer_reply_thread = None
 
+        # Displaying items and triggering item scheduling runs on these
+        # threads so that callers don't block on it.
+        self._display_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=DISPLAY_WORKERS
+        )
+
+        self._init_constant_replies()
+
         # Initialise ZMQ
         self.zmq_context = zmq.Context()
         self.zmq_scheduler_term_identifier = "zmq_scheduling_term_{id}".format(
             id=id(self)
         )
+        self._bind_termination_socket(self.zmq_scheduler_term_identifier)
 
         self.cache = None
 
@@ -129,6 +168,22 @@ class DisplayManager(ZMQRPC):
         self._renderers_lock = threading.RLock()
         self._renderers = dict()
 
+        # Secondary indices into self._renderers so that lookups don't have to
+        # scan every renderer: the uuids of all renderers at a position, the
+        # visible renderer at a position and the uuid of each renderer that
+        # is still waiting to register, keyed by its registration token.
+        self._renderer_uuids_by_position = dict()
+        self._visible_renderers = dict()
+        self._renderer_uuids_by_token = dict()
+
+        # Delayed callbacks (see _schedule_after) are kept in a heap of
+        # (deadline, sequence, fn, kwargs) tuples and run by a single timer
+        # thread, rather than starting a threading.Timer for each of them.
+        self._timer_condition = threading.Condition()
+        self._timer_heap = list()
+        self._timer_sequence = itertools.count()
+        self._timer_thread = None
+
     def _initialise_cache(self):
         cache_dir = self._config().get(
             'CacheFileStorage', 'CacheLocation', fallback="/tmp"
@@ -151,22 +206,24 @@ class DisplayManager(ZMQRPC):
         to_delete = list()
 
         with self._renderers_lock:
-            for renderer in self._renderers.values():
+            visible_renderer = self._visible_renderers.get(position)
 
-                if renderer.position != position:
-                    continue
+            for renderer_uuid in self._renderer_uuids_by_position.get(
+                position, ()
+            ):
+                renderer = self._renderers[renderer_uuid]
 
                 # Skip each renderer that hasn't registered yet as it may be
                 # in the process of becoming visible.
                 if not renderer.has_registered:
                     continue
 
-                # Skip each renderer that is visible.
-                if renderer.is_visible:
+                # Skip the renderer that is visible.
+                if renderer is visible_renderer:
                     continue
 
                 # Delete all renderer that are not visible but have registered.
-                to_delete.append(renderer.renderer_uuid)
+                to_delete.append(renderer_uuid)
 
         for renderer_uuid in to_delete:
             # Stop each renderer in a clean manner and then remove from dict.
@@ -180,9 +237,10 @@ class DisplayManager(ZMQRPC):
         """ Start new renderer and take old item off the screen.  This method
         will block until the renderer has started.
         """
-        log.debug("Display {item} at position {position}".format(
-            item=str(item), position=position)
-        )
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Display {item} at position {position}".format(
+                item=str(item), position=position)
+            )
 
         # First we check if the item was already displayed at position.
         if self._check_item_is_at_position(item, position):
@@ -198,36 +256,23 @@ class DisplayManager(ZMQRPC):
         log.debug("Started renderer with id: {}".format(renderer_id))
 
     @staticmethod
-    def _generate_params(params):
-        """Helper to generate valid params XML."""
-        params_root = ElementTree.Element('params')
-        param = ElementTree.Element(
-            'param', attrib={'name': 'token', 'value': 'UNUSED'}
+    def _generate_params_reply(params):
+        """Helper to generate a valid params reply as encoded XML."""
+        param_elems = ''.join(
+            PARAM_TEMPLATE.format(name=quoteattr(key), value=quoteattr(value))
+            for key, value in params.items()
         )
-        params_root.append(param)
-        for key, value in params.items():
-            param = ElementTree.Element(
-                'param', attrib={'name': key, 'value': value}
-            )
-            params_root.append(param)
-        return params_root
+        return PARAMS_REPLY_TEMPLATE.format(params=param_elems).encode()
 
     def _get_renderer(self, renderer_uuid):
         """ Get renderer instance for given renderer_uuid or None if it doesn't
         exist.
         """
-        with self._renderers_lock:
-            if renderer_uuid not in self._renderers:
-                return None
-
-            return self._renderers[renderer_uuid]
+        # A single dict lookup is atomic, so readers don't take the lock.
+        return self._renderers.get(renderer_uuid)
 
     def _get_renderer_at_position(self, position):
-        with self._renderers_lock:
-            for renderer_uuid, renderer in self._renderers.items():
-                if renderer.position == position and renderer.is_visible:
-                    return renderer
-            return None
+        return self._visible_renderers.get(position)
 
     def _get_renderer_uuid(self, msg_elem):
         """ Extract the renderer ID from a ZMQ message. """
@@ -250,10 +295,15 @@ class DisplayManager(ZMQRPC):
 
     @classmethod
     def _get_yarely_module_starter_path(cls):
-        return os.path.join(
-            cls._get_yarely_parent(), 'yarely', 'yarely', 'starters',
-            'yarely_module_starter.sh'
-        )
+        # The environment doesn't change for the lifetime of the scheduler,
+        # so the path is built on first use and then reused for every
+        # renderer.
+        if cls._yarely_module_starter_path is None:
+            cls._yarely_module_starter_path = os.path.join(
+                cls._get_yarely_parent(), 'yarely', 'yarely', 'starters',
+                'yarely_module_starter.sh'
+            )
+        return cls._yarely_module_starter_path
 
     @staticmethod
     def _get_yarely_parent():
@@ -272,11 +322,45 @@ class DisplayManager(ZMQRPC):
         return os.path.join(os.environ.get("HOME"), "proj")
 
     def _lookup_executing_renderer_with_token(self, token):
-        with self._renderers_lock:
-            for renderer in self._renderers.values():
-                if renderer.subprocess.has_token(token):
-                    return renderer
-        return None
+        renderer_uuid = self._renderer_uuids_by_token.get(token)
+        return self._renderers.get(renderer_uuid)
+
+    def _run_timers(self):
+        """ Run delayed callbacks once their deadline has passed. """
+        while True:
+            with self._timer_condition:
+                while True:
+                    if not self._timer_heap:
+                        self._timer_condition.wait()
+                        continue
+                    remaining = self._timer_heap[0][0] - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._timer_condition.wait(remaining)
+                _, _, fn, kwargs = heapq.heappop(self._timer_heap)
+
+            # A callback of None is the signal to stop (see stop()).
+            if fn is None:
+                return
+
+            # Run the callback without holding the condition so that new
+            # callbacks can be scheduled in the meantime.
+            try:
+                fn(**kwargs)
+            except Exception:
+                log.exception("Delayed callback {} failed".format(fn))
+
+    def _schedule_after(self, delay, fn, **kwargs):
+        """ Call fn with the given keyword arguments on the timer thread after
+        delay seconds.
+        """
+        deadline = time.monotonic() + delay
+        with self._timer_condition:
+            heapq.heappush(
+                self._timer_heap,
+                (deadline, next(self._timer_sequence), fn, kwargs)
+            )
+            self._timer_condition.notify()
 
     def _set_renderer_visible(self, renderer):
         """ There can be only one visible renderer at a time at one position.
@@ -291,28 +375,25 @@ class DisplayManager(ZMQRPC):
         visible.
         """
         with self._renderers_lock:
+            # The renderer may have been removed while we were waiting to
+            # make it visible (e.g. by remove_items()), don't bring it back.
+            if self._renderers.get(renderer.renderer_uuid) is not renderer:
+                log.debug("Renderer {} was removed, not making it "
+                          "visible".format(renderer.renderer_uuid))
+                return
+
             log.debug("Making {} visible at {}".format(
                 renderer.content_item, renderer.position
             ))
 
             # Now we can mark this renderer as visible.
             renderer.is_visible = True
-            renderer.active_timestamp = time.time()
-
-            # All other renderers at this position should be marked as not
-            # visible.
-            for iter_renderer in self._renderers.values():
-                if renderer is iter_renderer:
-                    continue
-                if not iter_renderer.has_registered:
-                    continue
-                if renderer.position != iter_renderer.position:
-                    continue
+            renderer.active_timestamp = time.monotonic()
+            self._visible_renderers[renderer.position] = renderer
 
-                self._stop_renderer(iter_renderer.renderer_uuid)
-
-            # Delete all invisible (but registered) renderers from the
-            # dictionary to clear up some memory.
+            # All other registered renderers at this position are now
+            # invisible, so a single cleanup pass stops them and deletes them
+            # from the dictionary to clear up some memory.
             self._cleanup_renderers(renderer.position)
 
     def _remove_renderer(self, renderer_uuid):
@@ -322,7 +403,20 @@ class DisplayManager(ZMQRPC):
         """
         with self._renderers_lock:
             log.debug("Removing renderer uuid {}".format(renderer_uuid))
-            del self._renderers[renderer_uuid]
+            renderer = self._renderers.pop(renderer_uuid)
+
+            position = renderer.position
+            position_uuids = self._renderer_uuids_by_position[position]
+            position_uuids.discard(renderer_uuid)
+            if not position_uuids:
+                del self._renderer_uuids_by_position[position]
+
+            if self._visible_renderers.get(position) is renderer:
+                del self._visible_renderers[position]
+
+            self._renderer_uuids_by_token.pop(
+                renderer.subprocess.security_token, None
+            )
 
     def _handle_request_finished_loading(self, msg_root, msg_elem):
         """ This method will be called when renderers have finished loading
@@ -334,7 +428,7 @@ class DisplayManager(ZMQRPC):
         # Handle None renderer  FIXME
         if not renderer:
             log.warning("Unknown renderer finished loading?")
-            return self._encapsulate_reply(self._generate_pong())
+            return self._zmq_pong_reply
 
         # Get the corresponding item and position, and add it to the dict of
         # active items on the screen.
@@ -345,20 +439,19 @@ class DisplayManager(ZMQRPC):
 
         # Report that we have opened a content item after the animation has
         # finished and the item became visible on the screen.
-        threading.Timer(
+        self._schedule_after(
             FADING_ANIMATION_DURATION, self.scheduler_mgr.report_pageview,
-            kwargs={'item': renderer.content_item}
-        ).start()
+            item=renderer.content_item
+        )
 
         # Give the display some time to finish the animation before we take the
         # old item off. We don't want to block here though!
-        threading.Timer(
-            FADING_ANIMATION_DURATION, self._set_renderer_visible, kwargs={
-                'renderer': renderer
-            }
-        ).start()
+        self._schedule_after(
+            FADING_ANIMATION_DURATION, self._set_renderer_visible,
+            renderer=renderer
+        )
 
-        return self._encapsulate_reply(self._generate_pong())
+        return self._zmq_pong_reply
 
     def _handle_request_preparation_failed(self, msg_root, msg_elem):
         """ This method will be called when a renderer has failed to load an
@@ -367,7 +460,11 @@ class DisplayManager(ZMQRPC):
 
         # We want to log this case.
         renderer_uuid = self._get_renderer_uuid(msg_elem)
-        renderer = self.renderer.get_renderer(renderer_uuid)
+        renderer = self._get_renderer(renderer_uuid)
+
+        if not renderer:
+            log.warning("Unknown renderer failed preparation?")
+            return self._zmq_pong_reply
 
         error_msg = (
             "Failed to load {item} by renderer {subp} at position "
@@ -385,14 +482,16 @@ class DisplayManager(ZMQRPC):
         )
 
         # We can remove the renderer from our references.
-        self.renderer.remove(renderer_uuid)
+        self._remove_renderer(renderer_uuid)
 
         # Since this is running in a separate thread, we should just trigger
         # new item scheduling instead of raising an error. We don't want to
         # wait for it to finish though.
-        threading.Thread(target=self.scheduler_mgr.item_scheduling).start()
+        run_in_background(
+            self._display_executor, self.scheduler_mgr.item_scheduling
+        )
 
-        return self._encapsulate_reply(self._generate_pong())
+        return self._zmq_pong_reply
 
     def _handle_incoming_zmq(self):
         """ Listen for incoming requests from renderers and map it on the
@@ -402,21 +501,15 @@ class DisplayManager(ZMQRPC):
         # Create reply socket to display manager.
         zmq_reply_socket = self.zmq_context.socket(zmq.REP)
         zmq_reply_socket.setsockopt(zmq.LINGER, ZMQ_SOCKET_LINGER_MSEC)
-        zmq_reply_socket.bind(
-            ZMQ_ADDRESS_LOCALHOST.format(port=ZMQ_RENDERER_REQ_PORT)
-        )
+        zmq_reply_socket.bind(RENDERER_ZMQ_ADDRESS)
 
         # Register this socket
         zmq_poller = zmq.Poller()
         zmq_poller.register(zmq_reply_socket, zmq.POLLIN)
 
         # Create termination socket
-        zmq_termination_reply_socket = self.zmq_context.socket(zmq.REP)
-        zmq_termination_reply_socket.bind(
-            ZMQ_ADDRESS_INPROC.format(
-                identifier=self.zmq_scheduler_term_identifier
-            )
-        )
+        zmq_termination_pull_socket = self._connect_termination_socket()
+        zmq_poller.register(zmq_termination_pull_socket, zmq.POLLIN)
 
         # Provide a method to loop over sockets that have data. It tries to
         # find matching methods for incoming requests/replies with
@@ -425,20 +518,21 @@ class DisplayManager(ZMQRPC):
             term = False
 
             for sock in socks_with_data:
-                if sock is zmq_termination_reply_socket:
+                if sock is zmq_termination_pull_socket:
                     return True
 
-                msg = sock.recv().decode()
-                reply = self._handle_zmq_msg(msg)
+                # ElementTree parses the received bytes directly, so there is
+                # no need to decode them first.
+                reply = self._handle_zmq_msg(sock.recv())
 
                 # Check if we got a valid reply from the method called.
                 if reply is None:
                     log.warning(
                         "No reply generated, replying with error!"
                     )
-                    reply = self._encapsulate_reply(self._generate_error())
+                    reply = self._zmq_error_reply
 
-                sock.send(ElementTree.tostring(reply))
+                sock.send(self._serialise_reply(reply))
 
             return term
 
@@ -454,27 +548,32 @@ class DisplayManager(ZMQRPC):
 
         # Cleanup ZMQ
         zmq_poller.unregister(zmq_reply_socket)
+        zmq_poller.unregister(zmq_termination_pull_socket)
         zmq_reply_socket.close()
+        zmq_termination_pull_socket.close()
 
     def _handle_register(self, msg_root):
         """ Send handler params as soon as the renderer has registered. """
-        log.debug(
-            "Handling register: {}".format(ElementTree.tostring(msg_root))
-        )
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "Handling register: {}".format(ElementTree.tostring(msg_root))
+            )
         token = msg_root.attrib['token']
         renderer = self._lookup_executing_renderer_with_token(token)
         if not renderer:
             lmsg = 'Spoof handler registration attempt: token is {token}'
             log.warning(lmsg.format(token=token))
         else:
-            renderer.subprocess.register()
-
-            # Mark the renderer as 'registered'.
+            # Mark the renderer as 'registered'. Registration replaces the
+            # subprocess's security token, so the old one is dropped from the
+            # index.
             with self._renderers_lock:
+                self._renderer_uuids_by_token.pop(token, None)
+                renderer.subprocess.register()
                 renderer.has_registered = True
 
-            reply = self._encapsulate_reply(
-                self._generate_params(renderer.subprocess.handler_params)
+            reply = self._generate_params_reply(
+                renderer.subprocess.handler_params
             )
 
             log.debug("Registered handler {}".format(msg_root))
@@ -509,8 +608,7 @@ class DisplayManager(ZMQRPC):
         renderer_uuid = str(uuid.uuid4())
         cmd_args = [
             self._get_yarely_module_starter_path(), '-m', module,
-            '--uuid', renderer_uuid,
-            ZMQ_ADDRESS_LOCALHOST.format(port=ZMQ_RENDERER_REQ_PORT)
+            '--uuid', renderer_uuid, RENDERER_ZMQ_ADDRESS
         ]
 
         # We take the first URI from the content item to display.
@@ -527,12 +625,8 @@ class DisplayManager(ZMQRPC):
         # Check if item_uri really is a URI. Some renderer don't like local
         # paths and prefer URIs (file://) instead.
         if (
-            'param_type' in args and
-            args['param_type'] == 'uri' and
-            True not in (item_uri.startswith('http'),
-                         item_uri.startswith('udp'),
-                         item_uri.startswith('file'),
-                         item_uri.startswith('rtmp'))
+            args.get('param_type') == 'uri' and
+            not item_uri.startswith(URI_SCHEME_PREFIXES)
         ):
             item_uri = platform.get_uri_from_local_path(item_uri)
 
@@ -544,7 +638,8 @@ class DisplayManager(ZMQRPC):
         if layout is not None:
             params_over_zmq.update(layout)
 
-        logging.debug("Send params over ZMQ: {}".format(params_over_zmq))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Send params over ZMQ: {}".format(params_over_zmq))
 
         subp = SubprocessExecutionWithErrorCapturing(
             cmd_args, params_over_zmq
@@ -558,6 +653,10 @@ class DisplayManager(ZMQRPC):
 
         with self._renderers_lock:
             self._renderers[renderer_uuid] = renderer
+            self._renderer_uuids_by_position.setdefault(
+                position, set()
+            ).add(renderer_uuid)
+            self._renderer_uuids_by_token[subp.security_token] = renderer_uuid
 
         return subprocess_id
 
@@ -590,22 +689,23 @@ class DisplayManager(ZMQRPC):
         consisting of all currently displayed content items.
         """
 
-        log.debug(
-            "Received request to display {item} at position {pos}".format(
-                item=str(item), pos=position
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "Received request to display {item} at position {pos}".format(
+                    item=str(item), pos=position
+                )
             )
-        )
 
         # We don't want to block here to make our app less responsive.
-        threading.Thread(
-            target=self._display_item, kwargs={
-                'item': item, 'layout': layout, 'position': position
-            }
-        ).start()
+        run_in_background(
+            self._display_executor, self._display_item,
+            item=item, layout=layout, position=position
+        )
 
     def get_active_item(self, position=DEFAULT_POSITION):
         """ Returns the active item at given position as a tuple:
-        (content_item, start_timestamp).
+        (content_item, start_timestamp). The timestamp is a time.monotonic()
+        value.
 
         If no item exists at position, this method will return (None, None).
         """
@@ -640,14 +740,17 @@ class DisplayManager(ZMQRPC):
 
     def remove_items(self):
         """ Take all items off the screen. """
-        renderers_to_remove = list()
+        # Every renderer goes, so the dictionary and its indices can simply
+        # be emptied rather than removing the renderers one by one.
         with self._renderers_lock:
-            for renderer in self._renderers.values():
-                self._stop_renderer(renderer.renderer_uuid)
-                renderers_to_remove.append(renderer)
+            renderers_to_stop = list(self._renderers.values())
+            self._renderers.clear()
+            self._renderer_uuids_by_position.clear()
+            self._visible_renderers.clear()
+            self._renderer_uuids_by_token.clear()
 
-            for renderer_to_remove in renderers_to_remove:
-                self._remove_renderer(renderer_to_remove.renderer_uuid)
+        for renderer in renderers_to_stop:
+            threading.Thread(target=renderer.stop).start()
 
     def start(self):
         """ Start listening for incoming requests/replies. The mapping from
@@ -664,13 +767,34 @@ class DisplayManager(ZMQRPC):
         self._zmq_display_renderer_reply_thread.daemon = True
         self._zmq_display_renderer_reply_thread.start()
 
+        self._timer_thread = threading.Thread(target=self._run_timers)
+        self._timer_thread.name = 'Display Manager Timer Thread'
+        self._timer_thread.daemon = True
+        self._timer_thread.start()
+
         # Initialise the cache
         self._initialise_cache()
 
     def stop(self):
         """ Stop renderer reply thread and all active renderers. """
 
-        self._zmq_display_renderer_reply_thread.stop()
+        self._send_termination()
+        self._zmq_display_renderer_reply_thread.join()
+
+        # Drop any pending callbacks and let the timer thread finish.
+        with self._timer_condition:
+            del self._timer_heap[:]
+            self._timer_heap.append(
+                (float('-inf'), next(self._timer_sequence), None, None)
+            )
+            self._timer_condition.notify()
+        self._timer_thread.join()
+
+        # Wait for items that are still being displayed.
+        self._display_executor.shutdown()
 
         # Stop all renderer and clear the dictionary.
         self.remove_items()
+
+        self._zmq_termination_push_socket.close()
+        self.zmq_context.term()
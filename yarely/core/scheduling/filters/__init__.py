@@ -10,7 +10,6 @@
 
 
 # Standard library imports
-import copy
 import logging
 
 
@@ -29,8 +28,11 @@ class Filter(object):
         :param config: FIXME.
         :type config: FIXME.
 
+        The CDS is not copied: filters must not modify it in place and should
+        return a new CDS instead (see DepthFirstFilter.filter_cds()).
+
         """
-        self.cds = copy.copy(cds)
+        self.cds = cds
         self.config = config
         self.context_store = context_store
 
@@ -78,12 +80,17 @@ from yarely.core.scheduling.filters.web_content_status_filter import (
 )                                                                        # NOQA
 from yarely.core.scheduling.filters.tacita_filter import TacitaFilter    # NOQA
 #
+# The fused filters combine some of the filters above
+from yarely.core.scheduling.filters.fused_filter import (
+    FusedFilter, PlayableContentFilter
+)                                                                        # NOQA
+#
 # Import this one LAST, it depends on all of the others
 from yarely.core.scheduling.filters import pipeline                      # NOQA
 
 __all__ = [
     "CacheFilter", "ConditionFilter", "ConstraintsAreMetFilter",
-    "ContentTypeFilter", "DepthFirstFilter", "Filter",
-    "NullFilter", "pipeline", "PriorityFilter", "TouchInputFilter",
-    "WebContentStatusFilter", "TacitaFilter"
+    "ContentTypeFilter", "DepthFirstFilter", "Filter", "FusedFilter",
+    "NullFilter", "pipeline", "PlayableContentFilter", "PriorityFilter",
+    "TouchInputFilter", "WebContentStatusFilter", "TacitaFilter"
 ]
@@ -36,6 +36,11 @@ class CacheFilter(DepthFirstFilter):
         super().__init__(cds, context_store, config)
         self._initialise_cache()
 
+        # A CDS can list the same file more than once, so the result of
+        # checking the cache is kept per URI. A new filter is created for
+        # every pipeline run, so the filesystem is still checked once per run.
+        self._file_cached_by_uri = {}
+
     def _initialise_cache(self):
         cache_dir = self.config.get(
             'CacheFileStorage', 'CacheLocation', fallback="/tmp"
@@ -59,5 +64,10 @@ class CacheFilter(DepthFirstFilter):
             # We don't care about the actual file hashes here, just want to see
             # if the file exists at all (otherwise the filter will take too
             # long to complete). Therefore we use strict=True here.
-            return self.cache.file_cached(content_item, strict=False)
+            uri = str(content_item)
+            if uri not in self._file_cached_by_uri:
+                self._file_cached_by_uri[uri] = self.cache.file_cached(
+                    content_item, strict=False
+                )
+            return self._file_cached_by_uri[uri]
         return True
@@ -29,6 +29,14 @@ class ContentTypeFilter(DepthFirstFilter):
 
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Most CDSs repeat a handful of content types many times, so whether
+        # a content type is supported is only looked up (and the exception
+        # for unsupported types only raised) once per content type.
+        self._supported_by_content_type = {}
+
     def keep_item(self, content_item):
         """Determines if the specified item should be kept. If this method
         returns False then the item will be filtered out of the CDS.
@@ -37,10 +45,21 @@ class ContentTypeFilter(DepthFirstFilter):
         :type content_item: a :class:`ContentItem` instance.
 
         """
-        try:
-            get_initial_args(content_item.get_content_type())
-        except UnsupportedMimeTypeError:
-            log.debug("Unrecognized Mime Type for: {}".format(str(content_item)))
-            return False
+        content_type = content_item.get_content_type()
+        supported = self._supported_by_content_type.get(content_type)
+
+        if supported is None:
+            try:
+                get_initial_args(content_type)
+            except UnsupportedMimeTypeError:
+                supported = False
+            else:
+                supported = True
+            self._supported_by_content_type[content_type] = supported
+
+        if not supported and log.isEnabledFor(logging.DEBUG):
+            log.debug("Unrecognized Mime Type for: {}".format(
+                str(content_item)
+            ))
 
-        return True
+        return supported
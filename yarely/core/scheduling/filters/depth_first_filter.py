@@ -10,13 +10,14 @@
 
 
 # Standard library imports
+import collections
 import copy
 import logging
 
 # Local (Yarely) imports
 from yarely.core.scheduling.filters import Filter
 from yarely.core.subscriptions.subscription_parser import (
-    ContentItem, ContentDescriptorSet
+    ContentDescriptorSet
 )
 
 
@@ -45,42 +46,43 @@ class DepthFirstFilter(Filter):
         """
         raise NotImplementedError()
 
-    def _remove_recursively(self, root):
-        """Walks recursively through the CDS and deletes a content item if
-        self.keep_item evaluates to False.
+    def _remove_items(self, root):
+        """Goes through the content items of the CDS and deletes a content
+        item if self.keep_item evaluates to False.
+
+        The items are taken from the flat list that the CDS keeps (see
+        ContentDescriptorSet.get_content_items()) rather than walking the
+        tree, and the items to delete are removed from each parent in one go.
 
         """
         # Stop if we reached a content item
         if not isinstance(root, ContentDescriptorSet):
             return
 
-        children = root.get_children_reference()
-
-        # Storing a list of items to delete because we don't want to remove
-        # children while we iterate over them.
-        children_to_delete = []
+        # Storing the items to delete per parent because we don't want to
+        # remove children while we iterate over them.
+        children_to_delete_by_parent = collections.OrderedDict()
 
-        for child in children:
-
-            # Walk deeper until we find a ContentItem object.
-            if not isinstance(child, ContentItem):
-                self._remove_recursively(child)
-                continue
+        for content_item in root.get_content_items():
 
             # Check if we can keep the item or not..
-            if self.keep_item(child):
+            if self.keep_item(content_item):
                 continue
 
-            # Delete the child from the tree after walking through the list.
-            children_to_delete.append(child)
+            parent = content_item.get_parent()
+            children_to_delete_by_parent.setdefault(
+                id(parent), (parent, [])
+            )[1].append(content_item)
 
         # Now let's delete all the items we were supposed to.
-        for child_to_delete in children_to_delete:
-            root.remove_child(child_to_delete)
+        for parent, children_to_delete in (
+            children_to_delete_by_parent.values()
+        ):
+            parent.remove_children(children_to_delete)
 
     def filter_cds(self):
         """This is the main method for starting the depth first search. It
-        first creates a copy of the CDS and calls _remove_recursively() on it.
+        first creates a copy of the CDS and calls _remove_items() on it.
         If you overwrite this method, make sure it always returns a CDS.
 
         """
@@ -88,9 +90,12 @@ class DepthFirstFilter(Filter):
 
         tmp_cds = copy.copy(self.cds)
 
-        # Start the recursive depth-first search.
-        self._remove_recursively(tmp_cds)
+        # Start the search.
+        self._remove_items(tmp_cds)
 
-        log.debug("Done with {} items.".format(len(tmp_cds)))
+        # len() may have to walk the CDS again, so only count when it will be
+        # logged.
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Done with {} items.".format(len(tmp_cds)))
 
         return tmp_cds
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2016 Lancaster University.
+#
+#
+# This file is part of Yarely.
+#
+# Licensed under the Apache License, Version 2.0.
+# For full licensing information see /LICENSE.
+
+
+# Local (Yarely) imports
+from yarely.core.scheduling.filters import (
+    CacheFilter, ContentTypeFilter, DepthFirstFilter
+)
+
+
+class FusedFilter(DepthFirstFilter):
+    """Runs the keep_item() checks of several depth first filters in a single
+    walk over a single copy of the CDS, rather than one walk and one copy per
+    filter. An item is kept only if every filter would keep it.
+
+    Only filters that do all of their work in keep_item() can be fused; those
+    that override filter_cds() (e.g. TouchInputFilter) cannot. Subclasses
+    list the filters to fuse in FUSED_FILTERS, cheapest check first.
+
+    """
+
+    FUSED_FILTERS = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fused_filters = [
+            FilterClass(*args, **kwargs) for FilterClass in self.FUSED_FILTERS
+        ]
+
+    def keep_item(self, content_item):
+        """Determines if the specified item should be kept. If this method
+        returns False then the item will be filtered out of the CDS.
+
+        In this implementation, we keep an item only if each of the fused
+        filters would keep it, stopping at the first one that wouldn't.
+
+        :param content_item: the item to check.
+        :type content_item: a :class:`ContentItem` instance.
+
+        """
+        for fused_filter in self._fused_filters:
+            if not fused_filter.keep_item(content_item):
+                return False
+        return True
+
+
+class PlayableContentFilter(FusedFilter):
+    """Removes items that Yarely can't play, either because no renderer
+    supports their content type or because they haven't been cached yet
+    (see ContentTypeFilter and CacheFilter).
+
+    """
+
+    FUSED_FILTERS = (ContentTypeFilter, CacheFilter)
@@ -17,7 +17,7 @@ import logging
 from yarely.core.scheduling.constants import CONTEXT_STORE_DEFAULT_DB_PATH
 from yarely.core.scheduling.contextstore import ContextStore
 from yarely.core.scheduling.filters import (
-    CacheFilter, ConstraintsAreMetFilter, ContentTypeFilter, PriorityFilter,
+    ConstraintsAreMetFilter, PlayableContentFilter, PriorityFilter,
     TouchInputFilter, WebContentStatusFilter, TacitaFilter
 )
 
@@ -26,9 +26,11 @@ from yarely.core.scheduling.filters import (
 # e.g. due to the type, caching and if web content is reachable. Then we check
 # constraints that are defined in the CDS.
 # Tacita should come before PriorityFilter.
+# PlayableContentFilter runs the ContentTypeFilter and CacheFilter checks in
+# a single pass.
 # Todo: we might need an emergency content filter
 DEFAULT_FILTERS = (
-    TouchInputFilter, ContentTypeFilter, CacheFilter, # WebContentStatusFilter,  # Fixme
+    TouchInputFilter, PlayableContentFilter, # WebContentStatusFilter,  # Fixme
     TacitaFilter, ConstraintsAreMetFilter, PriorityFilter
 )
 
@@ -78,27 +80,27 @@ class FilterPipeline(object):
         filtered_cds = copy.copy(cds)
 
         for FilterClass in self.filters:
-            log.debug(
-                "Starting filter: {filter_name} with {num_of_items} "
-                "items".format(
-                    filter_name=FilterClass.__name__,
-                    num_of_items=len(filtered_cds.get_content_items())
+            # Counting the items walks the whole CDS, so only do it for the
+            # debug log when that is actually going to be emitted.
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(
+                    "Starting filter: {filter_name} with {num_of_items} "
+                    "items".format(
+                        filter_name=FilterClass.__name__,
+                        num_of_items=len(filtered_cds.get_content_items())
+                    )
                 )
-            )
 
             tmp_filter = FilterClass(
                 filtered_cds, self.context_store, self._config()
             )
             filtered_cds = tmp_filter.filter_cds()
 
-            log.debug(
-                "Done with {} items".format(
-                    len(filtered_cds.get_content_items())
-                )
-            )
+            num_of_items = len(filtered_cds.get_content_items())
+            log.debug("Done with {} items".format(num_of_items))
 
             # Stop the filtering process if there is no items left.
-            if not filtered_cds:
+            if not num_of_items:
                 break
 
         return filtered_cds
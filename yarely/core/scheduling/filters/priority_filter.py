@@ -34,6 +34,27 @@ class PriorityFilter(ConditionFilter):
     def _get_condition(self):
         return self._current_priority_level
 
+    @staticmethod
+    def _get_priority_level(content_item):
+        """Returns the priority level at which the item would be kept, or
+        None if its priority constraints (including those of its parents)
+        disagree and it would not be kept at any level.
+
+        """
+        priorities = {
+            constraint.priority for constraint in content_item.get_constraints(
+                recurse_up_tree=True, constraint_type=PriorityConstraint
+            )
+        }
+
+        # Items without a priority play at the default priority (see
+        # SubscriptionElement.constraints_are_met()).
+        if not priorities:
+            return PriorityConstraint.DEFAULT_VALUE
+        if len(priorities) == 1:
+            return priorities.pop()
+        return None
+
     def filter_cds(self):
         """Returns either None if there is no items eligible to play or a list
         of filtered content items by keeping the original hierarchy.
@@ -44,30 +65,34 @@ class PriorityFilter(ConditionFilter):
         """
         log.debug("Running priority filter.")
 
-        priority_levels = reversed(
-            range(len(PriorityConstraint.ALL_PRIORITIES))
+        # Find the highest priority level that has at least one eligible
+        # element in a single pass, rather than filtering the CDS once for
+        # every priority level from the highest down.
+        priority_levels = {
+            self._get_priority_level(content_item)
+            for content_item in self.cds.get_content_items()
+        }
+
+        # If every item plays at the same level then nothing would be
+        # filtered out, so skip the condition filtering pass altogether.
+        if len(priority_levels) == 1 and None not in priority_levels:
+            log.debug("Only priority level {} is populated".format(
+                next(iter(priority_levels))
+            ))
+            return self.cds
+
+        priority_levels.discard(None)
+
+        if not priority_levels:
+            return self.cds
+
+        priority_level = max(
+            priority_levels, key=PriorityConstraint.ALL_PRIORITIES.index
         )
+        log.debug("Stopping at priority level {}".format(priority_level))
 
-        # Loop through all priorities starting with the highest. Stop as soon
-        # as we have at least one eligible element and return this as the
-        # filtered CDS.
-        for priority_level in priority_levels:
-            self._current_priority_level = PriorityConstraintCondition(
-                priority_level
-            )
-
-            # Start the normal condition filtering process.
-            tmp_cds = super().filter_cds()
-
-            # If there is at least one eligible element, stop here and return
-            # this as the filtered CDS.
-            number_of_content_items = len(tmp_cds.get_content_items())
-            if number_of_content_items > 0:
-                log.debug(
-                    "Stopping at priority level {} with {} elements".format(
-                        priority_level, number_of_content_items
-                    )
-                )
-                return tmp_cds
-
-        return self.cds
+        # Start the normal condition filtering process for that level only.
+        self._current_priority_level = PriorityConstraintCondition(
+            priority_level
+        )
+        return super().filter_cds()
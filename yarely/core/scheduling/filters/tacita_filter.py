@@ -24,16 +24,24 @@ class TacitaFilter(DepthFirstFilter):
     TODO: read out priroity from content item XML (which is a content set?)
     """
 
+    # A request stays in the context store until it times out, so the same
+    # one is seen on many passes in a row. The key, parsed content item and
+    # requested files of the last request are kept here (a new filter is
+    # created for every pass) so it is only parsed once.
+    _last_content_request = (None, None, frozenset())
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.requested_content_files = set()
+        self._requested_content_file_strs = ()
 
     def get_tacita_content_request(self):
         recent_event = self.context_store.get_latest_content_items_by_context_type(
             CONTEXT_TYPE_CONTENT_TRIGGER
         )
 
-        log.debug('Tacita recent event: {}'.format(recent_event))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('Tacita recent event: {}'.format(recent_event))
 
         if not recent_event:
             return None
@@ -57,6 +65,15 @@ class TacitaFilter(DepthFirstFilter):
         if not content_item_xml_str:
             return None
 
+        request_key = (content_item_created, content_item_xml_str)
+        last_request_key, content_item, requested_content_files = (
+            type(self)._last_content_request
+        )
+        if request_key == last_request_key:
+            self.requested_content_files.update(requested_content_files)
+            return content_item
+
+        content_item = None
         content_item_xml = ElementTree.fromstring(content_item_xml_str)
 
         # Use the appropriate parser here
@@ -88,21 +105,25 @@ class TacitaFilter(DepthFirstFilter):
             # In this case we can just add the content item into the set
             self.requested_content_files.add(content_item)
 
+        type(self)._last_content_request = (
+            request_key, content_item,
+            frozenset(self.requested_content_files)
+        )
+
         return content_item
 
     def keep_item(self, content_item):
         """ Comparing each item from the CDS whether it matches the touch
         input. Only keeping the item that does match the input.
         """
-        log.debug('Tacita requested files: {}'.format(str(self.requested_content_files)))
-        log.debug('Tacita from CDS: {}'.format(content_item))
+        content_item_str = str(content_item)
 
-        for content_file in self.requested_content_files:
-            log.debug("Tacita comparing {} - {}".format(str(content_file), str(content_item)))
-            if str(content_item).startswith(str(content_file)):
-                return True
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('Tacita from CDS: {}'.format(content_item_str))
 
-        return False
+        # startswith() accepts a tuple and tests every requested file in a
+        # single call.
+        return content_item_str.startswith(self._requested_content_file_strs)
 
     def filter_cds(self):
         """ FIXME """
@@ -111,11 +132,20 @@ class TacitaFilter(DepthFirstFilter):
 
         self.get_tacita_content_request()
 
-        log.debug(self.requested_content_files)
-
         if not self.requested_content_files:
             return self.cds
 
+        # Stringify the requested files once here rather than for every
+        # content item compared against them in keep_item(). These are the
+        # URI prefixes that keep_item() matches items against.
+        self._requested_content_file_strs = tuple(
+            str(content_file) for content_file in self.requested_content_files
+        )
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('Tacita requested files: {}'.format(
+                self._requested_content_file_strs
+            ))
+
         # Start the filtering process to see if the touch input ContentItem
         # was originally part of the CDS. We only want to play items that were
         # scheduled in the first place.
@@ -96,9 +96,10 @@ class TouchInputFilter(DepthFirstFilter):
         if not self.touch_content_item:
             return self.cds
 
-        log.debug("Found content item in context store: {}".format(
-            str(self.touch_content_item)
-        ))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Found content item in context store: {}".format(
+                str(self.touch_content_item)
+            ))
 
         # Start the filtering process to see if the touch input ContentItem
         # was originally part of the CDS. We only want to play items that were
@@ -10,7 +10,9 @@
 
 
 # Standard library imports
+import concurrent.futures
 import logging
+import socket
 from urllib import request
 
 # Local (Yarely) imports
@@ -20,6 +22,16 @@ from yarely.core.scheduling.filters import DepthFirstFilter
 
 log = logging.getLogger(__name__)
 
+# The maximum number of web content items to check concurrently.
+WEB_CONTENT_STATUS_WORKERS = 16
+
+# Seconds to wait for a web server before treating its content as missing.
+WEB_CONTENT_STATUS_TIMEOUT = 5
+
+# Status codes returned by servers that don't support HEAD requests, in
+# which case we fall back to a GET request.
+HEAD_NOT_SUPPORTED_STATUSES = (405, 501)
+
 
 class WebContentStatusFilter(DepthFirstFilter):
     """ This filter checks if (web) content items exist. The filter only
@@ -29,6 +41,45 @@ class WebContentStatusFilter(DepthFirstFilter):
 
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._uri_exists = {}
+
+    @staticmethod
+    def _check_uri(uri):
+        """Returns True if the web server for the specified URI returns a
+        valid status code (between 200 and 399).
+
+        :param string uri: the URI to check.
+        :rtype: boolean
+
+        """
+        for method in ('HEAD', 'GET'):
+            # We fake the user-agent as some web servers wouldn't return the
+            # content and raise 403 instead.
+            req = request.Request(
+                uri, headers={'User-Agent': 'Mozilla/5.0'}, method=method
+            )
+
+            # Check if the URL exists at all first.
+            try:
+                with request.urlopen(
+                    req, timeout=WEB_CONTENT_STATUS_TIMEOUT
+                ) as response:
+                    response_status = response.getcode()
+            except request.HTTPError as e:
+                if (method == 'HEAD' and
+                        e.code in HEAD_NOT_SUPPORTED_STATUSES):
+                    continue
+                log.info("Content item does not exist: {}".format(uri))
+                return False
+            except (request.URLError, socket.timeout):
+                log.info("Content item does not exist: {}".format(uri))
+                return False
+
+            # Anything between 200 and 399 is fine, >400 is an error.
+            return 200 <= response_status < 400
+
     def keep_item(self, content_item):
 
         """Determines if the specified item should be kept. If this method
@@ -46,17 +97,26 @@ class WebContentStatusFilter(DepthFirstFilter):
             return True
 
         uri = str(content_item)
+        if uri not in self._uri_exists:
+            self._uri_exists[uri] = self._check_uri(uri)
+        return self._uri_exists[uri]
 
-        # We fake the user-agent as some web servers wouldn't return the
-        # content and raise 403 instead.
-        req = request.Request(uri, headers={'User-Agent': 'Mozilla/5.0'})
+    def filter_cds(self):
+        """Checks all of the web content items in the CDS concurrently and
+        then runs the depth first search using the results.
 
-        # Check if the URL exists at all first.
-        try:
-            response_status = request.urlopen(req).getcode()
-        except request.URLError:
-            log.info("Content item does not exist: {}".format(uri))
-            return False
-
-        # Anything between 200 and 399 is fine, >400 is an error.
-        return 200 <= response_status < 400
+        """
+        uris = {
+            str(content_item) for content_item in self.cds.get_content_items()
+            if not Cache.needs_to_be_cached(content_item)
+        }
+
+        if uris:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(len(uris), WEB_CONTENT_STATUS_WORKERS)
+            ) as executor:
+                self._uri_exists.update(
+                    zip(uris, executor.map(self._check_uri, uris))
+                )
+
+        return super().filter_cds()
@@ -62,8 +62,12 @@ class SchedulingManager(ApplicationWithConfig):
         self.cds = None
         self.filtered_cds = None
 
-        # FIXME - ContextStore takes a path to the SQLite database file
-        # self.context_store = ContextStore(None)
+        # The first content item of each content type in the CDS, rebuilt on
+        # every CDS update (see _get_item_by_content_type()).
+        self._content_items_by_type = {}
+
+        # The context store is shared with the schedulers. It needs the
+        # config, so it's opened in start() (see _initialise_context_store()).
         self.context_store = None
 
         # Allows us to power control the display
@@ -85,15 +89,22 @@ class SchedulingManager(ApplicationWithConfig):
         # properly. We will initialise this one as soon as we need it.
         self.display_manager = DisplayManager(self)
 
-        # Current timer that will call the item scheduling method to trigger a
-        # running the scheduler to find a new item.
-        self.item_scheduling_timer = None
+        # When the item scheduling method should next be called to run the
+        # scheduler to find a new item (a time.monotonic() value, or None if
+        # it shouldn't). A single long-lived thread waits for this deadline
+        # (see _run_item_scheduling_timeout()), the condition wakes it up
+        # when the deadline changes.
+        self._item_scheduling_condition = threading.Condition()
+        self._item_scheduling_deadline = None
+        self._item_scheduling_stopped = False
+        self._item_scheduling_thread = None
 
         # Cache Manager that we will initialise as soon as we need it
         self.cache_manager = None
 
         # Analytics library will be initialised as soon as we need it
         self.analytics = None
+        self.analytics_tracking_id = None
 
         # TODO - get this from config!
         self.number_of_items = 1  # Todo: we only support 1 at the moment.
@@ -110,10 +121,9 @@ class SchedulingManager(ApplicationWithConfig):
     def _cache_cds(self):
         """Add all items to the cache queue from CacheManager."""
 
-        # Get all content items and add one by one to the cache queue.
+        # Get all content items and add them to the cache queue in one go.
         content_items = self.cds.get_content_items(flatten=True)
-        for content_item in content_items:
-            self.cache_manager.cache_file(content_item)
+        self.cache_manager.cache_files(content_items)
 
     def _display_split_screen(self, items):
         """ Split items on the screen and show multiple items at the time. """
@@ -130,42 +140,33 @@ class SchedulingManager(ApplicationWithConfig):
         # TODO - error handling in Display
         # if not successful, start immediately new item scheduling to get a
         # different piece of content.
-        for i in range(len(items)):
+        # Always line up with the left hand side of the screen and make sure
+        # each item uses up the entire width and its share of the height.
+        layout_x = str(0)
+        layout_width = str(self.display_resolution_width)
+        layout_height = self.display_resolution_height / len(items)
+        layout_height_str = str(layout_height)
+
+        for i, item in enumerate(items):
             # Start on the top with playing the image.
-            layout_y = (
-                (self.display_resolution_height*i / len(items)) +
-                self.display_resolution_height / len(items)
-            )
-
-            # Always line up with the left hand side of the screen.
-            layout_x = 0
-
-            # Make sure it uses up the entire width and height it can.
-            layout_width = self.display_resolution_width
-            layout_height = self.display_resolution_height / len(items)
+            layout_y = layout_height * (i + 1)
 
             tmp_layout = {
-                "layout_style": "x_y_width_height", "layout_x": str(layout_x),
-                "layout_y": str(layout_y), "layout_width": str(layout_width),
-                "layout_height": str(layout_height)
+                "layout_style": "x_y_width_height", "layout_x": layout_x,
+                "layout_y": str(layout_y), "layout_width": layout_width,
+                "layout_height": layout_height_str
             }
 
             # Displaying this item. Items probably won't appear at the very
             # same time.
-            self.display_manager.display_item(items[i], tmp_layout, i)
+            self.display_manager.display_item(item, tmp_layout, i)
 
     def _get_item_by_content_type(self, content_type):
         """ Get the first content item of a given content type! """
         if not self.cds:
             return None
 
-        content_items = self.cds.get_content_items()
-
-        for content_item in content_items:
-            if content_item.get_content_type() == content_type:
-                return content_item
-
-        return None
+        return self._content_items_by_type.get(content_type)
 
     def _initialise_analytics(self):
         # Prevent Yarely from crashing when tracking_id wasn't specified in the
@@ -184,6 +185,7 @@ class SchedulingManager(ApplicationWithConfig):
                 "Analytics tracking_id not specified in Yarely config!"
             )
 
+        self.analytics_tracking_id = analytics_tracking_id
         self.analytics = PhemeAnalytics(analytics_tracking_id)
 
     def _initialise_cache_manager(self):
@@ -202,9 +204,53 @@ class SchedulingManager(ApplicationWithConfig):
             fallback=DEFAULT_CONTENT_DURATION
         )
 
+        # The touch button and app selection layouts only depend on the
+        # display resolution, so they are built once here rather than every
+        # time the touch button or app selection page is shown.
+
+        # Make the touch button a square button. This should match the display
+        # resolution. This is optimised for 1920x1080 displays.
+        # Todo: make this variable
+        layout_width = 200
+        layout_height = 130
+
+        # Align on the bottom right.
+        layout_y = TOUCH_INPUT_LAYOUT_MARGIN
+        layout_x = (
+            self.display_resolution_width - layout_width
+            - TOUCH_INPUT_LAYOUT_MARGIN
+        )
+
+        self._touch_button_layout = {
+            "layout_style": "x_y_width_height", "layout_x": str(layout_x),
+            "layout_y": str(layout_y), "layout_width": str(layout_width),
+            "layout_height": str(layout_height),
+            "layout_window_level_increase": str(1)
+        }
+
+        # The app selection page spans the width of the display.
+        layout_width = (
+            self.display_resolution_width - TOUCH_INPUT_LAYOUT_MARGIN * 2
+        )
+        layout_height = 130
+
+        # Align on the bottom right.
+        layout_y = TOUCH_INPUT_LAYOUT_MARGIN
+        layout_x = (
+            self.display_resolution_width - layout_width
+            - TOUCH_INPUT_LAYOUT_MARGIN
+        )
+
+        self._touch_selection_layout = {
+            "layout_style": "x_y_width_height", "layout_x": str(layout_x),
+            "layout_y": str(layout_y), "layout_width": str(layout_width),
+            "layout_height": str(layout_height),
+            "layout_window_level_increase": str(2)
+        }
+
     def _initialise_context_store(self):
-        # Same as with analytics, we want to initialise it when we actually
-        # need it and after everything has loaded.
+        # Opened once the config has loaded, before anything that reads or
+        # writes context is started.
         context_store_path = self.config.get(
             'ContextStore', 'ContextStorePath',
             fallback=CONTEXT_STORE_DEFAULT_DB_PATH
@@ -228,7 +274,9 @@ class SchedulingManager(ApplicationWithConfig):
             log.debug("No CDS, stopping initialisation.")
             return
 
-        # Stop here if we have initialised the touch button already.
+        # Stop here if we have initialised the touch button already. This is a
+        # dictionary lookup in the display manager, so it is cheap enough to
+        # do on every update (and catches the button having been taken off).
         active_touch_button = (
             self.display_manager.get_active_item(TOUCH_INPUT_BUTTON_POSITION)
         )[0]
@@ -249,28 +297,8 @@ class SchedulingManager(ApplicationWithConfig):
             log.debug("Touch button and/or app selection page not in CDS.")
             return
 
-        # Make it a square button. This should match the display resolution.
-        # This is optimised for 1920x1080 displays.
-        # Todo: make this variable
-        layout_width = 200
-        layout_height = 130
-
-        # Align on the bottom right.
-        layout_y = TOUCH_INPUT_LAYOUT_MARGIN
-        layout_x = (
-            self.display_resolution_width - layout_width
-            - TOUCH_INPUT_LAYOUT_MARGIN
-        )
-
-        touch_button_layout = {
-            "layout_style": "x_y_width_height", "layout_x": str(layout_x),
-            "layout_y": str(layout_y), "layout_width": str(layout_width),
-            "layout_height": str(layout_height),
-            "layout_window_level_increase": str(1)
-        }
-
         self.display_manager.display_item(
-            content_item_touch, touch_button_layout,
+            content_item_touch, self._touch_button_layout,
             TOUCH_INPUT_BUTTON_POSITION
         )
 
@@ -278,32 +306,13 @@ class SchedulingManager(ApplicationWithConfig):
 
         log.debug("Initialising touch selection.")
 
-        layout_width = (
-            self.display_resolution_width - TOUCH_INPUT_LAYOUT_MARGIN * 2
-        )
-        layout_height = 130
-
-        # Align on the bottom right.
-        layout_y = TOUCH_INPUT_LAYOUT_MARGIN
-        layout_x = (
-            self.display_resolution_width - layout_width
-            - TOUCH_INPUT_LAYOUT_MARGIN
-        )
-
-        tmp_layout = {
-            "layout_style": "x_y_width_height", "layout_x": str(layout_x),
-            "layout_y": str(layout_y), "layout_width": str(layout_width),
-            "layout_height": str(layout_height),
-            "layout_window_level_increase": str(2)
-        }
-
         content_item_app_selection = self._get_item_by_content_type(
             TOUCH_INPUT_CONTENT_TYPE_APP_SELECTION
         )
 
         # Make it visible!
         self.display_manager.display_item(
-            content_item_app_selection, tmp_layout,
+            content_item_app_selection, self._touch_selection_layout,
             TOUCH_INPUT_APP_SELECTION_POSITION
         )
 
@@ -314,6 +323,33 @@ class SchedulingManager(ApplicationWithConfig):
             }
         ).start()
 
+    def _run_item_scheduling_timeout(self):
+        """ Call item_scheduling() each time the item scheduling timeout
+        expires, until stop() is called.
+        """
+        while True:
+            with self._item_scheduling_condition:
+                while True:
+                    if self._item_scheduling_stopped:
+                        return
+                    if self._item_scheduling_deadline is None:
+                        self._item_scheduling_condition.wait()
+                        continue
+                    remaining = (
+                        self._item_scheduling_deadline - time.monotonic()
+                    )
+                    if remaining <= 0:
+                        break
+                    self._item_scheduling_condition.wait(remaining)
+                self._item_scheduling_deadline = None
+
+            # Run item scheduling without holding the condition, it will
+            # start the next timeout itself.
+            try:
+                self.item_scheduling()
+            except Exception:
+                log.exception("Item scheduling failed")
+
     def _start_item_scheduling_timeout(self, timeout=5):
         """ Starts new timeout for item scheduling and kills existing one.
         In case we didn't find an item to schedule, we wouldn't pass in a
@@ -322,29 +358,25 @@ class SchedulingManager(ApplicationWithConfig):
 
         self.report_internal_scheduler_state('start_item_scheduling_timeout')
 
-        # First stop  current timeout in case there is one.
-        self._stop_item_scheduling_timeout()
-
-        self.item_scheduling_timer = threading.Timer(
-            timeout, self.item_scheduling
-        )
-        self.item_scheduling_timer.start()
+        # Replacing the deadline replaces the current timeout in case there
+        # is one.
+        with self._item_scheduling_condition:
+            self._item_scheduling_deadline = time.monotonic() + timeout
+            self._item_scheduling_condition.notify()
 
     def _stop_displaying_items(self):
         if self.display_manager is not None:
             self.display_manager.remove_items()
 
     def _stop_item_scheduling_timeout(self):
-        if self.item_scheduling_timer is not None:
-            self.item_scheduling_timer.cancel()
+        with self._item_scheduling_condition:
+            self._item_scheduling_deadline = None
+            self._item_scheduling_condition.notify()
 
     def _track_pageview_for_context_store(self, item):
         """Storing the currently showing item in the internal context store.
 
         """
-        if self.context_store is None:
-            self._initialise_context_store()
-
         self.context_store.add_context(CONTEXT_TYPE_PAGEVIEW, item)
 
     def _track_pageview_for_ixion(self, item):
@@ -356,6 +388,11 @@ class SchedulingManager(ApplicationWithConfig):
         if self.analytics is None:
             self._initialise_analytics()
 
+        # The analytics module doesn't track anything without a tracking_id,
+        # so don't bother looking up what we would report.
+        if self.analytics_tracking_id is None:
+            return
+
         # We are only reporting the first URI in the list.
         content_uri = str(item)
         content_file = item.get_files()[0]
@@ -391,6 +428,14 @@ class SchedulingManager(ApplicationWithConfig):
         # Replace stored content descriptor set in case it is different and
         # return True to trigger new content scheduling.
         self.cds = cds
+
+        content_items_by_type = {}
+        for content_item in cds.get_content_items():
+            content_items_by_type.setdefault(
+                content_item.get_content_type(), content_item
+            )
+        self._content_items_by_type = content_items_by_type
+
         return True
 
     @semaphore_lock_decorator
@@ -484,13 +529,17 @@ class SchedulingManager(ApplicationWithConfig):
                 return
 
             # Otherwise we want to make sure that the item restarts after its
-            # time runs out, especially important for videos.
-            time_difference = time.time() - active_timestamp
+            # time runs out, especially important for videos. The monotonic
+            # clock is used so that changes to the system clock can't make
+            # this negative or huge.
+            time_difference = time.monotonic() - active_timestamp
 
             # Stop here if the item still has time left. Restart timeout in
             # this case with the amount of time the item has left though.
             if time_difference < active_item_duration:
-                self._start_item_scheduling_timeout(int(time_difference))
+                self._start_item_scheduling_timeout(
+                    active_item_duration - time_difference
+                )
                 return
 
             # Otherwise continue and re-schedule the piece of content.
@@ -513,24 +562,33 @@ class SchedulingManager(ApplicationWithConfig):
         # Restart item scheduling after the content duration of new item.
         self._start_item_scheduling_timeout(new_item_duration)
 
-        log.debug("Timeout: {}".format(self.item_scheduling_timer))
+        log.debug("Timeout: {}".format(new_item_duration))
 
     def main(self):
         """Running in the background and constantly waiting for new updates
         coming in through the cds_update queue. It will trigger new item
         scheduling if the updated CDS differs to the previously stored CDS.
+        Returns once stop() has been called.
 
         """
 
         log.debug("Waiting for Subscription Updates.")
 
         while True:
+            # Block on queue until there is an update (or None from stop()).
+            latest_cds_update = self.cds_updates.get()
+
+            # Updates can arrive in bursts and only the newest one matters, so
+            # drain the queue rather than filtering and scheduling for each.
             try:
-                # Block on queue for one second.
-                latest_cds_update = self.cds_updates.get(True, 1)
+                while latest_cds_update is not None:
+                    latest_cds_update = self.cds_updates.get_nowait()
             except queue.Empty:
-                # Skip the current loop if we didn't get an updated CDS.
-                continue
+                pass
+
+            if latest_cds_update is None:
+                log.debug("Stopped waiting for Subscription Updates.")
+                return
 
             # If the CDS wasn't updated because it equals the old one, then we
             # can just skip this one. Otherwise we want to re-initiate caching
@@ -582,9 +640,10 @@ class SchedulingManager(ApplicationWithConfig):
         action = state
         label = 'Current yarely scheduler state is {}'.format(state)
 
-        log.debug("REPORTING {label} with value {value}".format(
-            label=label, value=value
-        ))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("REPORTING {label} with value {value}".format(
+                label=label, value=value
+            ))
 
         self.analytics.track_event_async(
             category=category, action=action, value=value, label=label
@@ -610,10 +669,19 @@ class SchedulingManager(ApplicationWithConfig):
 
         # Initialise some packages first.
         self._initialise_constants()
+        self._initialise_context_store()
         self._initialise_cache_manager()
         self._initialise_analytics()
         self._initialise_display_manager()
 
+        # Start the thread that runs item scheduling when its timeout expires.
+        self._item_scheduling_thread = threading.Thread(
+            target=self._run_item_scheduling_timeout
+        )
+        self._item_scheduling_thread.name = 'Item Scheduling Timeout Thread'
+        self._item_scheduling_thread.daemon = True
+        self._item_scheduling_thread.start()
+
         # Start context and constraints parser, scheduler and display manager.
         self.cc_parser.start()
         self.display_manager.start()
@@ -625,8 +693,19 @@ class SchedulingManager(ApplicationWithConfig):
 
         """
         self.cc_parser.stop()
+
+        # Stop running item scheduling on timeouts.
+        with self._item_scheduling_condition:
+            self._item_scheduling_stopped = True
+            self._item_scheduling_condition.notify()
+        if self._item_scheduling_thread is not None:
+            self._item_scheduling_thread.join()
+
         self.display_manager.stop()
 
+        # Wake up main() so that it returns.
+        self.cds_updates.put(None)
+
 
 if __name__ == "__main__":
     application_loop(SchedulingManager)
@@ -9,11 +9,6 @@
 # For full licensing information see /LICENSE.
 
 
-# Local (Yarely) imports
-from yarely.core.scheduling.constants import CONTEXT_STORE_DEFAULT_DB_PATH
-from yarely.core.scheduling.contextstore import ContextStore
-
-
 class Scheduler(object):
     """A scheduler must always extend this base class. It should implement
     get_item_to_schedule. It is expected that this method returns at any time
@@ -27,9 +22,10 @@ class Scheduler(object):
 
     """
 
+    __slots__ = ('scheduler_mgr',)
+
     def __init__(self, scheduler_mgr):
         self.scheduler_mgr = scheduler_mgr
-        self.context_store_local = ContextStore(CONTEXT_STORE_DEFAULT_DB_PATH)
 
     def config(self):
         """FIXME.
@@ -41,13 +37,14 @@ class Scheduler(object):
         return self.scheduler_mgr.config
 
     def context_store(self):
-        """FIXME.
+        """Returns the context store of the scheduler manager, which is shared
+        by all schedulers.
 
         :rtype: FIXME
         :return: FIXME.
 
         """
-        return self.context_store_local
+        return self.scheduler_mgr.context_store
 
     def filtered_cds(self):
         """Returns a reference to the filtered content descriptor set that is
@@ -11,24 +11,25 @@
 
 # Standard library imports
 import logging
-import threading
-from queue import Queue
 
 
 log = logging.getLogger(__name__)
 
 
-class LotteryTicketAllocator(threading.Thread):
+class LotteryTicketAllocator(object):
     """Base class for lottery ticket allocators. When writing a ticket
     allocator, please make sure that __init__ gets always called.
 
+    Allocators are run one after the other by the LotteryScheduler (see
+    execute()) in the thread making the scheduling decision.
+
     """
     def __init__(
-        self, thread_name, context_store, filtered_cds, tickets_for_allocation
+        self, name, context_store, filtered_cds, tickets_for_allocation
     ):
         """
 
-        :param string thread_name: FIXME.
+        :param string name: FIXME.
         :param context_store: FIXME.
         :type context_store: FIXME.
         :param filtered_cds: FIXME.
@@ -38,40 +39,36 @@ class LotteryTicketAllocator(threading.Thread):
 
         """
         #  """ FIXME - references to context_store and filtered_cds """
-        super().__init__(name=thread_name)
-        self.thread_name = thread_name
+        self.name = name
 
         self.context_store = context_store
         self.cds = filtered_cds
 
-        # Queue of "empty" tickets that can be used to generate tickets.
+        # List of "empty" tickets that can be used to generate tickets.
         self.tickets_for_allocation = tickets_for_allocation
 
-        # Assigned tickets should be stored in this queue. It will be read out
-        # by the LotteryScheduler when it expects the output to be done.
-        self.allocated_tickets = Queue()
+        # Assigned tickets should be appended to this list. It will be read
+        # out by the LotteryScheduler once self.ready has been set.
+        self.allocated_tickets = []
 
         # Indicates if the ticket allocation has finished.
         self.ready = False
 
     def allocate_tickets(self):
-        """This method will be called once the thread starts in order to
+        """This method will be called by execute() in order to
         initiate the lottery ticket allocation. The ticket allocator can use
         empty pre-generated tickets out of self.tickets_for_allocation which is
-        a Queue. In future it could block on this queue and wait for an
-        additional set of tickets to be made available to this ticket allocator
-        (although this functionality we will probably implement later).
+        a list. In future it could wait for an additional set of tickets to be
+        made available to this ticket allocator (although this functionality
+        we will probably implement later).
 
-        After a certain amount of time the LotteryScheduler will fetch
-        self.allocated_tickets. This queue should _only_ consist of lottery
+        Once this method returns the LotteryScheduler will fetch
+        self.allocated_tickets. This list should _only_ consist of lottery
         tickets that have an item assigned to it.
 
         If the ticket allocation process has finished, self.ready should be set
-        to True.
-
-        NOTE: the LotteryScheduler can terminate the ticket allocation
-        process at any time and just grab tickets from the queue when it thinks
-        it has enough tickets to make the scheduling decision.
+        to True. The LotteryScheduler ignores the tickets of allocators that
+        haven't set it.
 
         :raises NotImplementedError: always.
 
@@ -85,11 +82,8 @@ class LotteryTicketAllocator(threading.Thread):
 
         raise NotImplementedError()
 
-    def run(self):
-        """Starting the ticket allocation process as soon as the thread
-        starts.
-
-        """
+    def execute(self):
+        """Run the ticket allocation process."""
         log.debug(
             "Starting ticket allocator: {}".format(self.__class__.__name__)
         )
@@ -105,6 +99,8 @@ class LotteryTicket(object):
 
     """
 
+    __slots__ = ('item', 'allocated_by')
+
     def __init__(self, item=None, allocated_by=None):
         """
         :param item: FIXME.
@@ -128,19 +124,12 @@ class LotteryTicket(object):
 
     @classmethod
     def generate_empty_lottery_tickets(cls, amount):
-        """Generates a set of empty lottery ticket objects.
+        """Generates a list of empty lottery ticket objects.
 
         :param integer amount: number of tickets to generate.
 
         """
-
-        tickets = set()
-
-        for i in range(amount):
-            tmp_ticket = cls()
-            tickets.add(tmp_ticket)
-
-        return tickets
+        return [cls() for _ in range(amount)]
 
     def get_item(self):
         """FIXME.
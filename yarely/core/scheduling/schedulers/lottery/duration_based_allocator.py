@@ -11,14 +11,13 @@
 
 # Standard library imports
 import logging
+import operator
 
 # Internal Yarely imports
 from yarely.core.scheduling.constants import DEFAULT_CONTENT_DURATION
 from yarely.core.scheduling.schedulers.lottery import LotteryTicketAllocator
 
 
-# Lookup table for optimisation: object ID to calculated ratios
-_CACHE = dict()
 log = logging.getLogger(__name__)
 
 
@@ -33,7 +32,6 @@ class _DurationBasedAllocator(LotteryTicketAllocator):
     VALID_SORT_ORDERS = [FAVOUR_SHORT_ITEMS, FAVOUR_LONG_ITEMS]
 
     def __init__(self, *args, **kwargs):
-        global _CACHE
         super().__init__(*args, **kwargs)
 
         # Sort order (do we prefer short content items or long ones)
@@ -43,11 +41,6 @@ class _DurationBasedAllocator(LotteryTicketAllocator):
             if self.sort_order not in self.VALID_SORT_ORDERS:
                 raise ValueError()
 
-        # We maintain a cache for content item durations.
-        # Here we reset the cache since object ids may have been reused since
-        # the last time this allocator was used.
-        _CACHE = dict()
-
     def allocate_tickets(self):
         """Allocates a proportion of tickets to each content item based
         on their duration.
@@ -68,8 +61,14 @@ class _DurationBasedAllocator(LotteryTicketAllocator):
         self._allocate(content_item_duration_pairs)
 
     def _allocate(self, content_item_duration_pairs):
+        # This runs for every scheduling decision, so the tickets and the
+        # per item debug messages are dealt with as cheaply as we can.
+        tickets_for_allocation = self.tickets_for_allocation
+        allocated_tickets = self.allocated_tickets
+        debug = log.isEnabledFor(logging.DEBUG)
+
         log.debug("DurationBasedAllocator starting with {} tickets".format(
-            len(self.tickets_for_allocation)
+            len(tickets_for_allocation)
         ))
 
         # Sort items by duration -- initially shortest to longest,
@@ -77,44 +76,48 @@ class _DurationBasedAllocator(LotteryTicketAllocator):
         # preference to (as specified by self.sort_order) come at the
         # BEGINNING of the list. That means once we've done the initial sort
         # we then do a quick check to see if we should reverse the list.
-        content_item_duration_pairs.sort(key=lambda x: x[1])
+        content_item_duration_pairs.sort(key=operator.itemgetter(1))
         if self.sort_order is self.FAVOUR_LONG_ITEMS:
             content_item_duration_pairs.reverse()
 
         # Ensure (if possible) that every item gets at least one ticket
         for (content_item, duration) in content_item_duration_pairs:
             # Check we haven't run out of tickets to allocate
-            if not self.tickets_for_allocation:
+            if not tickets_for_allocation:
                 break
 
             # Allocate one ticket to this item
-            log.debug(
-                "item {} with duration of {} seconds has been allocated "
-                "1 ticket".format(content_item, duration)
-            )
-            ticket = self.tickets_for_allocation.pop()
+            if debug:
+                log.debug(
+                    "item {} with duration of {} seconds has been allocated "
+                    "1 ticket".format(content_item, duration)
+                )
+            ticket = tickets_for_allocation.pop()
             ticket.assign_item(content_item)
-            self.allocated_tickets.put_nowait(ticket)
+            allocated_tickets.append(ticket)
 
         # If all the tickets have been allocated now, then we're done already
-        if not self.tickets_for_allocation:
+        if not tickets_for_allocation:
             self.ready = True
             return
 
         # Count up how many more tickets remain for us to allocate
-        ticket_count = len(self.tickets_for_allocation)
+        ticket_count = len(tickets_for_allocation)
         log.debug("DurationBasedAllocator has {} tickets remaining".format(
             ticket_count
         ))
 
         # Calculate the total duration (in seconds)
-        (tmp, durations) = zip(*content_item_duration_pairs)
-        total_duration = sum(durations)
+        total_duration = sum(
+            duration for (content_item, duration)
+            in content_item_duration_pairs
+        )
 
         # Calculate the ratio of tickets per second of duration
         tickets_per_second = ticket_count / total_duration
 
         # Allocate the remaining tickets based on this ratio
+        last_index = len(content_item_duration_pairs) - 1
         for (i, (content_item, duration)) in enumerate(
             content_item_duration_pairs
         ):
@@ -122,34 +125,35 @@ class _DurationBasedAllocator(LotteryTicketAllocator):
             # For each content item we'll calculate how many tickets we should
             # allocate (rounded to the nearest whole number but never more
             # than the number of tickets available.
+            tickets_left = len(tickets_for_allocation)
             tickets_for_item = min(
-                round(tickets_per_second * duration),
-                len(self.tickets_for_allocation)
+                round(tickets_per_second * duration), tickets_left
             )
 
             # Occasionally rounding errors mean that the last item
             # gets a different number of tickets than the rounding would have
             # given out... tough, it'll just have to take whatever is left.
-            if i is len(content_item_duration_pairs)-1:
-                tickets_for_item = len(self.tickets_for_allocation)
-
-            log.debug(
-                "item {} with duration of {} seconds has been allocated "
-                "{}/{} tickets".format(
-                    content_item, duration, tickets_for_item,
-                    ticket_count
+            if i == last_index:
+                tickets_for_item = tickets_left
+
+            if debug:
+                log.debug(
+                    "item {} with duration of {} seconds has been allocated "
+                    "{}/{} tickets".format(
+                        content_item, duration, tickets_for_item,
+                        ticket_count
+                    )
                 )
-            )
 
             # Allocate the right number of tickets and put them in the
             # allocated pool.
-            for i in range(tickets_for_item):
-                ticket = self.tickets_for_allocation.pop()
+            for _ in range(tickets_for_item):
+                ticket = tickets_for_allocation.pop()
                 ticket.assign_item(content_item)
-                self.allocated_tickets.put_nowait(ticket)
+                allocated_tickets.append(ticket)
 
             # Check that there's still some tickets to allocate
-            if not self.tickets_for_allocation:
+            if not tickets_for_allocation:
                 log.debug("no more tickets to allocate")
                 break
 
@@ -167,19 +171,7 @@ def get_duration(content_item):
     :rtype: float
 
     """
-    global _CACHE
-
-    # Retrieve value from cache if available
-    content_item_id = id(content_item)
-    if content_item_id not in _CACHE:
-        _CACHE[content_item_id] = dict()
-    elif 'duration' in _CACHE[content_item_id]:
-        return _CACHE[content_item_id]['duration']
-
-    # Get the duration
+    # ContentItem works the duration out once when it is parsed, so there is
+    # no need to cache it here.
     duration = content_item.get_duration()
-    duration = duration if duration is not None else DEFAULT_CONTENT_DURATION
-
-    # Cache and return the duration
-    _CACHE[content_item_id]['duration'] = duration
-    return duration
+    return duration if duration is not None else DEFAULT_CONTENT_DURATION
@@ -10,6 +10,7 @@
 
 
 # Standard library imports
+import itertools
 import random
 
 # Local (Yarely) imports
@@ -26,19 +27,21 @@ class _EqualDistributionAllocator(LotteryTicketAllocator):
 
          """
         content_items = self.cds.get_content_items()
-        content_items_pointer = 0
 
         # Randomise content list since it's unlikely that the number of
         # tickets divides neatly by the number of content items.
         random.shuffle(content_items)
 
         # Loop as long as we have tickets and just keep grabbing content items
-        # from the list.
-        for ticket in self.tickets_for_allocation:
-            ticket.assign_item(content_items[content_items_pointer])
-            self.allocated_tickets.put_nowait(ticket)
-            content_items_pointer = (
-                (content_items_pointer + 1) % len(content_items)
-            )
+        # from the list, starting again at the beginning when we get to the
+        # end.
+        for ticket, content_item in zip(
+            self.tickets_for_allocation, itertools.cycle(content_items)
+        ):
+            ticket.assign_item(content_item)
+
+        # Without any content items no ticket has been given one.
+        if content_items:
+            self.allocated_tickets.extend(self.tickets_for_allocation)
 
         self.ready = True
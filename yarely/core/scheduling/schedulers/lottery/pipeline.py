@@ -10,11 +10,10 @@
 
 
 # Standard library imports
+import collections
 import json
 import logging
-import queue
 import random
-import time
 
 # Local (Yarely) imports
 from yarely.core.scheduling.schedulers import Scheduler
@@ -29,7 +28,12 @@ from yarely.core.scheduling.schedulers.lottery import (
 DEFAULT_TICKET_ALLOCATORS = {
     RatioAllocator: {'lottery_tickets': 1000}
 }
-DEFAULT_TICKET_ALLOCATOR_TIMEOUT_SEC = 15
+
+# Ticket counts per allocator that each item starts with when reporting
+# ticket allocations, so that every allocator is reported for every item.
+_NO_ALLOCATED_TICKETS = {
+    allocator.__name__: 0 for allocator in DEFAULT_TICKET_ALLOCATORS
+}
 
 
 log = logging.getLogger(__name__)
@@ -44,37 +48,38 @@ class LotterySchedulerPipeline(Scheduler):
     to the manager instance.
     """
 
+    __slots__ = (
+        'ticket_pool', 'ticket_allocator_instances', 'ticket_allocators'
+    )
+
     def __init__(self, scheduler_mgr):
         super().__init__(scheduler_mgr)
-        self.ticket_pool = set()
-        self.ticket_allocator_threads = set()
+        self.ticket_pool = []
+        self.ticket_allocator_instances = set()
         self._initialise_ticket_allocators()
 
-    def _all_ticket_allocators_ready(self):
-        """ Loop through all instances and check if the allocators are ready.
-        """
-        for allocator in self.ticket_allocator_threads:
-            if not allocator.ready:
-                return False
-        return True
-
     def _draw_winner(self):
         """ FIXME """
-        winning_ticket = random.sample(self.ticket_pool, 1)[0]
+        winning_ticket = random.choice(self.ticket_pool)
         self._report_winning_ticket(winning_ticket)
         return winning_ticket
 
     def _grab_tickets_from_allocators(self):
-        for allocator in self.ticket_allocator_threads:
-            while True:
-                try:
-                    allocated_ticket = allocator.allocated_tickets.get_nowait()
-                except queue.Empty:
-                    break
-
-                # For each allocated ticket, set the corresponding allocator.
+        for allocator in self.ticket_allocator_instances:
+            # Only take tickets from allocators that have finished.
+            if not allocator.ready:
+                log.warning(
+                    "Ticket allocator {} didn't finish, ignoring its "
+                    "tickets.".format(allocator)
+                )
+                continue
+
+            allocated_tickets = allocator.allocated_tickets
+
+            # For each allocated ticket, set the corresponding allocator.
+            for allocated_ticket in allocated_tickets:
                 allocated_ticket.allocated_by = allocator
-                self.ticket_pool.add(allocated_ticket)
+            self.ticket_pool.extend(allocated_tickets)
 
     def _initialise_ticket_allocators(self):
         """ Initialising the list of ticket allocators. In future this will
@@ -92,28 +97,28 @@ class LotterySchedulerPipeline(Scheduler):
         """
         tickets_for_item = dict()
 
-        for ticket in self.ticket_pool:
-            item = str(ticket.get_item())
-
-            allocator = str(ticket.allocated_by)
-
-            # If we never looked at the item.
-            if item not in tickets_for_item:
-                tickets_for_item[item] = {allocator: 0}
-
-            # If we never had the allocator for this item.
-            if allocator not in tickets_for_item[item]:
-                tickets_for_item[item][allocator] = 0
-
-            tickets_for_item[item][allocator] += 1
-
-        # Check if we have considered all allocators.
-        for item, item_value in tickets_for_item.items():
-            for allocator in DEFAULT_TICKET_ALLOCATORS:
-                if allocator.__name__ in item_value:
-                    continue
-                log.debug("EXTENDED {}".format(item_value))
-                item_value.update({allocator.__name__: 0})
+        # The ticket pool holds the tickets of every allocator that finished
+        # (see _grab_tickets_from_allocators()), so we count the tickets of
+        # each of those allocators by item in one go.
+        for allocator in self.ticket_allocator_instances:
+            if not allocator.ready:
+                continue
+
+            allocator_name = str(allocator)
+            item_ticket_counts = collections.Counter([
+                str(ticket.get_item())
+                for ticket in allocator.allocated_tickets
+            ])
+
+            for item, ticket_count in item_ticket_counts.items():
+                # If we never looked at the item.
+                if item not in tickets_for_item:
+                    tickets_for_item[item] = dict(_NO_ALLOCATED_TICKETS)
+
+                item_tickets = tickets_for_item[item]
+                item_tickets[allocator_name] = (
+                    item_tickets.get(allocator_name, 0) + ticket_count
+                )
 
         self.scheduler_mgr.report_internal_scheduler_state(
             'ticket_allocations', json.dumps(tickets_for_item)
@@ -131,13 +136,13 @@ class LotterySchedulerPipeline(Scheduler):
             'winner_draw', json.dumps(tmp_report)
         )
 
-    def _start_lottery_ticket_allocators(self):
+    def _run_lottery_ticket_allocators(self):
 
         count_total_empty_tickets = 0
 
         # Get rid of all ticket allocators from the last iteration.
         # Todo: reuse old allocators instead of clearing here.
-        self.ticket_allocator_threads.clear()
+        self.ticket_allocator_instances.clear()
 
         for AllocatorClass in self.ticket_allocators:
             config = self.ticket_allocators[AllocatorClass]
@@ -156,8 +161,14 @@ class LotterySchedulerPipeline(Scheduler):
                     len(self.filtered_cds().get_content_items())
                 )
             )
-            tmp_allocator.start()
-            self.ticket_allocator_threads.add(tmp_allocator)
+            # A failing allocator shouldn't stop the others from allocating.
+            try:
+                tmp_allocator.execute()
+            except Exception:
+                log.exception(
+                    "Ticket allocator {} failed.".format(tmp_allocator)
+                )
+            self.ticket_allocator_instances.add(tmp_allocator)
 
         self.scheduler_mgr.report_internal_scheduler_state(
             'lottery_scheduler_total_empty_tickets', count_total_empty_tickets
@@ -170,17 +181,12 @@ class LotterySchedulerPipeline(Scheduler):
             'start_lottery_scheduler_ticket_allocation'
         )
 
-        # Empty ticket pool
-        self.ticket_pool = set()
+        # Empty ticket pool. It's a list so that drawing a winner doesn't need
+        # to copy it first (random.sample() copies a set into a tuple).
+        self.ticket_pool = []
 
         # (Re-) allocate tickets into the ticket pool.
-        self._start_lottery_ticket_allocators()
-
-        # Keep checking if all ticket allocators are ready. We will wait until
-        # all ticket allocators are done with the ticket allocation and then
-        # grab all the tickets afterwards.
-        while not self._all_ticket_allocators_ready():
-            time.sleep(0.1)
+        self._run_lottery_ticket_allocators()
 
         self.scheduler_mgr.report_internal_scheduler_state(
             'start_lottery_scheduler_item_drawing'
@@ -189,8 +195,6 @@ class LotterySchedulerPipeline(Scheduler):
         # Get all tickets now.
         self._grab_tickets_from_allocators()
 
-        # TODO - cleanup allocator threads here?
-
         self._report_allocator_tickets()
 
         # Check if there are any tickets allocated at all.
@@ -31,8 +31,9 @@ class _RandomAllocator(LotteryTicketAllocator):
         # Loop as long as we have tickets and just keep grabbing random
         # content items from the list -- content items may be chosen
         # multiple times (random.choice() samples with replacement).
+        choice = random.choice
         for ticket in self.tickets_for_allocation:
-            ticket.assign_item(random.choice(content_items))
-            self.allocated_tickets.put_nowait(ticket)
+            ticket.assign_item(choice(content_items))
+        self.allocated_tickets.extend(self.tickets_for_allocation)
 
         self.ready = True
@@ -19,8 +19,11 @@ from yarely.core.scheduling.constants import DEFAULT_CONTENT_DURATION
 from yarely.core.scheduling.schedulers.lottery import LotteryTicketAllocator
 
 
-# Lookup table for optimisation: object ID to calculated ratios
-_CACHE = dict()
+# Lookup tables for optimisation: object ID to calculated ratios. The
+# unscaled ratio may be None, so lookups use _NOT_CACHED as their default.
+_SCALED_RATIO_CACHE = dict()
+_UNSCALED_RATIO_CACHE = dict()
+_NOT_CACHED = object()
 log = logging.getLogger(__name__)
 
 
@@ -34,11 +37,12 @@ class _SimplePerItemRatioAllocator(LotteryTicketAllocator):
     """
 
     def __init__(self, *args, **kwargs):
-        global _CACHE
+        global _SCALED_RATIO_CACHE, _UNSCALED_RATIO_CACHE
         super().__init__(*args, **kwargs)
 
-        # Need to reset the cache as object ids may be reused
-        _CACHE = dict()
+        # Need to reset the caches as object ids may be reused
+        _SCALED_RATIO_CACHE = dict()
+        _UNSCALED_RATIO_CACHE = dict()
 
     def allocate_tickets(self):
         """ Allocates a proportion of tickets to each content item based
@@ -96,7 +100,7 @@ class _SimplePerItemRatioAllocator(LotteryTicketAllocator):
             for i in range(tickets_for_item):
                 ticket = self.tickets_for_allocation.pop()
                 ticket.assign_item(content_item)
-                self.allocated_tickets.put_nowait(ticket)
+                self.allocated_tickets.append(ticket)
 
             # Check that there's still some tickets to allocate
             if not self.tickets_for_allocation:
@@ -162,22 +166,10 @@ def get_duration(content_item):
     :rtype: float
 
     """
-    global _CACHE
-
-    # Retrieve value from cache if available
-    content_item_id = id(content_item)
-    if content_item_id not in _CACHE:
-        _CACHE[content_item_id] = dict()
-    elif 'duration' in _CACHE[content_item_id]:
-        return _CACHE[content_item_id]['duration']
-
-    # Get the duration
+    # ContentItem works the duration out once when it is parsed, so there is
+    # no need to cache it here.
     duration = content_item.get_duration()
-    duration = duration if duration is not None else DEFAULT_CONTENT_DURATION
-
-    # Cache and return the duration
-    _CACHE[content_item_id]['duration'] = duration
-    return duration
+    return duration if duration is not None else DEFAULT_CONTENT_DURATION
 
 
 def get_scaled_ratio(content_item):
@@ -188,14 +180,11 @@ def get_scaled_ratio(content_item):
     :rtype: float
 
     """
-    global _CACHE
-
     # Retrieve value from cache if available
     content_item_id = id(content_item)
-    if content_item_id not in _CACHE:
-        _CACHE[content_item_id] = dict()
-    elif 'scaled_ratio' in _CACHE[content_item_id]:
-        return _CACHE[content_item_id]['scaled_ratio']
+    scaled_ratio = _SCALED_RATIO_CACHE.get(content_item_id, _NOT_CACHED)
+    if scaled_ratio is not _NOT_CACHED:
+        return scaled_ratio
 
     # Get unscaled ratio for this item
     local_ratio = get_unscaled_ratio(content_item)
@@ -256,9 +245,9 @@ def get_scaled_ratio(content_item):
         # OK, local ratio should now be beautifully scaled in line with
         # any siblings, final bit of math just needs to account for the
         # parent ratio
-        _CACHE[id(c)]['scaled_ratio'] = parent_ratio * sibling_scaled_ratio
+        _SCALED_RATIO_CACHE[id(c)] = parent_ratio * sibling_scaled_ratio
 
-    return _CACHE[content_item_id]['scaled_ratio']
+    return _SCALED_RATIO_CACHE[content_item_id]
 
 
 def get_unscaled_ratio(content_item):
@@ -271,14 +260,11 @@ def get_unscaled_ratio(content_item):
     :rtype: float
 
     """
-    global _CACHE
-
     # Retrieve value from cache if available
     content_item_id = id(content_item)
-    if content_item_id not in _CACHE:
-        _CACHE[content_item_id] = dict()
-    elif 'unscaled_ratio' in _CACHE[content_item_id]:
-        return _CACHE[content_item_id]['unscaled_ratio']
+    local_ratio = _UNSCALED_RATIO_CACHE.get(content_item_id, _NOT_CACHED)
+    if local_ratio is not _NOT_CACHED:
+        return local_ratio
 
     # Try to find a PlaybackConstraint for this item (non-recursively) that
     # specifies the ratio.
@@ -298,5 +284,5 @@ def get_unscaled_ratio(content_item):
         local_ratio = PlaybackConstraint.UNSCALED_RATIO_DEFAULT
 
     # Cache and return the ratio value
-    _CACHE[content_item_id]['unscaled_ratio'] = local_ratio
+    _UNSCALED_RATIO_CACHE[content_item_id] = local_ratio
     return local_ratio
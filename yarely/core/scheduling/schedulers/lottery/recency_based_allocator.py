@@ -138,7 +138,7 @@ class _RecencyBasedAllocator(LotteryTicketAllocator):
                 tmp_ticket.assign_item(
                     filtered_content_items[pointer]['content_item']
                 )
-                self.allocated_tickets.put_nowait(tmp_ticket)
+                self.allocated_tickets.append(tmp_ticket)
 
             # Start with the first one in case we don't have many content items
             pointer = (pointer + 1) % len(filtered_content_items)
@@ -254,7 +254,7 @@ class SensorManager(Manager):
             self.zmq_scheduler_request_queue.put_nowait(
                 self._encapsulate_request(msg_elem)
             )
-        return self._encapsulate_reply(self._generate_pong())
+        return self._zmq_pong_reply
 
     def check_in(self):
         """Provide an occasional check-in to the Scheduler via ZMQ."""
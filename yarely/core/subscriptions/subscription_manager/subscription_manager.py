@@ -283,7 +283,7 @@ class SubscriptionManager(URIManager):
                 subs_parser = XMLSubscriptionParser(msg_elem)
             except XMLSubscriptionParserError:
                 log.exception('Failed to parse subscription update.')
-                return self._encapsulate_reply(self._generate_pong())
+                return self._zmq_pong_reply
             content_descriptor_set = subs_parser.get_descriptor_set()
             self._persistent_store.store_descriptor_set(content_descriptor_set)
 
@@ -336,7 +336,7 @@ class SubscriptionManager(URIManager):
                     self._encapsulate_request(subs_update_root)
                 )
 
-            return self._encapsulate_reply(self._generate_pong())
+            return self._zmq_pong_reply
 
     def _init_handlers(self):
         # The _registered_handlers dictionary is keyed by addressing scheme,
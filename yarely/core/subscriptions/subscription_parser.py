@@ -10,7 +10,6 @@
 
 
 # Standard library imports
-import copy
 import inspect
 from urllib.error import URLError
 from urllib.request import urlopen
@@ -101,6 +100,7 @@ class SubscriptionElementFile:
         """
         super().__init__()
         self.etree = ElementTree.ElementTree(etree_elem)
+        self._identity = None
 
         # Handle sources
         self._sources = []
@@ -134,13 +134,16 @@ class SubscriptionElementFile:
                     hash_types[hash.get_type()] = hash.get_hash()
                     self._hashes.append(hash)
 
+        # Hash objects by type for the get_<type>_hash() methods.
+        self._hashes_by_type = {
+            hash_obj.get_type(): hash_obj for hash_obj in self._hashes
+        }
+
     def __getattr__(self, name):
         try:
             (get, hash_type, hash) = name.split('_')
             if get == 'get' and hash == 'hash':
-                for hash_obj in self._hashes:
-                    if hash_obj.get_type() == hash_type.lower():
-                        return hash_obj.get_hash
+                return self._hashes_by_type[hash_type.lower()].get_hash
         except:
             pass
         raise NameError('Name \'{name}\' is not defined'.format(name=name))
@@ -161,7 +164,14 @@ class SubscriptionElementFile:
         :rtype: string
 
         """
+        # Files don't change once parsed, so the identity is worked out on
+        # the first call only (it is compared often, see __eq__ methods).
+        if self._identity is None:
+            self._identity = self._get_identity()
+        return self._identity
 
+    def _get_identity(self):
+        """Work out the identity string for get_identity()."""
         try:
             return self.get_md5_hash()
         except NameError:
@@ -336,8 +346,11 @@ class SubscriptionElement:
             constraint_parser = ConstraintsParser(constraints)
             self._constraints = constraint_parser.get_constraints()
 
-        # Remote items must have at least one requires-file tag
+        # Remote items must have at least one requires-file tag. The URI of
+        # the first file is what __str__ returns; it's looked up on first use
+        # and cached (add_file() resets it).
         self._files = []
+        self._uri = None
         if self.get_type() == 'remote':
             required_files = self.etree.findall('requires-file')
             if len(required_files) is 0:
@@ -354,6 +367,17 @@ class SubscriptionElement:
 
         """
         self._files.append(sources_list)
+        self._uri = None
+
+    def _copy_structure(self, parent):
+        """Return a shallow copy of this element that belongs to parent. The
+        parsed files, constraints and XML are shared with this element.
+
+        """
+        element = self.__class__.__new__(self.__class__)
+        element.__dict__.update(self.__dict__)
+        element._parent = parent
+        return element
 
     def constraints_are_met(self, condition=None, ignore_unimplemented=True,
                             recurse_up_tree=True):
@@ -514,10 +538,12 @@ class SubscriptionElement:
 
     def __str__(self):
         """Get a representation of this object (normally a URI)."""
-        try:
-            return self.get_files()[0].get_sources()[0].get_uri()
-        except IndexError:    # This exception occurs for 'inline' sets/items
-            return repr(self)
+        if self._uri is None:
+            try:
+                self._uri = self.get_files()[0].get_sources()[0].get_uri()
+            except IndexError:  # This exception occurs for 'inline' sets/items
+                return repr(self)
+        return self._uri
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
@@ -592,6 +618,7 @@ class ContentDescriptorSet(SubscriptionElement):
             )
 
         self._children = []
+        self._content_items = None
         root = self.etree.getroot()
         for elem in root:
             if elem.tag == 'content-set':
@@ -641,6 +668,22 @@ class ContentDescriptorSet(SubscriptionElement):
         :rtype: list
 
         """
+        # The flat list of all items is what the filters ask for on every
+        # pass, so it is built once and kept until a child is removed (see
+        # remove_children()).
+        if condition is None and flatten:
+            if self._content_items is None:
+                self._content_items = self._get_content_items(
+                    condition, ignore_unimplemented, flatten
+                )
+            return self._content_items[:]
+
+        return self._get_content_items(
+            condition, ignore_unimplemented, flatten
+        )
+
+    def _get_content_items(self, condition, ignore_unimplemented, flatten):
+        """Walk the tree for get_content_items()."""
         filtered_children = []
         for child in self.get_children():
             if isinstance(child, ContentItem):
@@ -684,21 +727,84 @@ class ContentDescriptorSet(SubscriptionElement):
 
         """
 
-        # First check if child is actually a child
-        if child not in self._children:
+        self.remove_children([child])
+
+    def remove_children(self, children):
+        """Remove each of children, self must be their parent. Like
+        remove_child(), but the child list and the internal etree
+        representation are each rebuilt only once, however many children are
+        removed.
+
+        Children are matched by identity rather than equality, so only the
+        given objects are removed even if a sibling compares equal to one.
+
+        :param children: the children to remove.
+        :type children: an iterable of :class:`SubscriptionElement` instances.
+
+        """
+        ids_to_remove = {id(child) for child in children}
+
+        # First check if the children are actually children
+        remaining_children = [
+            child for child in self._children
+            if id(child) not in ids_to_remove
+        ]
+        if len(self._children) - len(remaining_children) != len(ids_to_remove):
             raise SubscriptionElementNotFoundError
 
-        self.etree.getroot().remove(child.etree.getroot())
-        self._children.remove(child)
+        elems_to_remove = {
+            id(child.etree.getroot()) for child in self._children
+            if id(child) in ids_to_remove
+        }
+        root = self.etree.getroot()
+        root[:] = [elem for elem in root if id(elem) not in elems_to_remove]
+        self._children[:] = remaining_children
+
+        # The flat lists of items of this set and its ancestors are now stale.
+        cds = self
+        while cds is not None:
+            cds._content_items = None
+            cds = cds.get_parent()
+
+    def _copy_structure(self, parent):
+        """Return a copy of this set that belongs to parent. Every nested set
+        gets its own list of children and its own XML element so that
+        remove_child() on the copy leaves this set untouched. Content items
+        are copied shallowly (see SubscriptionElement._copy_structure()).
+
+        """
+        cds = super()._copy_structure(parent)
+        cds._content_items = None
+        root = self.etree.getroot()
+        root_copy = ElementTree.Element(root.tag, dict(root.attrib))
+        root_copy.text = root.text
+        root_copy.tail = root.tail
+
+        children_by_elem = {
+            id(child.etree.getroot()): child for child in self._children
+        }
+        cds._children = []
+        for elem in root:
+            child = children_by_elem.get(id(elem))
+            if child is not None:
+                child = child._copy_structure(cds)
+                cds._children.append(child)
+                elem = child.etree.getroot()
+            root_copy.append(elem)
+
+        cds.etree = ElementTree.ElementTree(root_copy)
+        return cds
 
     def __copy__(self):
         """Returns a new instance of a Content Descriptor Set object.
 
+        Only the structure is copied, nothing is parsed again: see
+        _copy_structure().
+
         :rtype: :class:`ContentDescriptorSet`
 
         """
-        etree_root_copy = copy.deepcopy(self.etree.getroot())
-        return ContentDescriptorSet(etree_root_copy)
+        return self._copy_structure(parent=None)
 
     def __deepcopy__(self):
         """Preventing people from using deepcopy. Use self.__copy__() instead.
@@ -761,6 +867,12 @@ class ContentItem(SubscriptionElement):
           if 'content-type' in etree_elem.attrib else None
         )
 
+        # The duration only depends on the item's own constraints, which
+        # don't change once parsed. The schedulers ask for it on every
+        # scheduling decision, so it is worked out here once (copies of the
+        # item made by filters share it).
+        self._duration = self._get_duration()
+
     def get_content_type(self):
         """Return the content (mime) type of this item.
 
@@ -793,6 +905,10 @@ class ContentItem(SubscriptionElement):
         :rtype: float
 
         """
+        return self._duration
+
+    def _get_duration(self):
+        """Work out the duration for get_duration()."""
         # Get any duration constraints for the specified item
         duration_constraints = self.get_constraints(
             recurse_up_tree=False, constraint_type=PreferredDurationConstraint